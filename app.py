@@ -0,0 +1,46 @@
+"""The whole API as one ASGI application:
+
+    uvicorn app:app --workers 4
+
+Importing this module only loads configuration and routes. Prompt files, databases, the TTS
+cache and the LLM / Speech / TTS clients are opened by the lifespan hook when a worker starts,
+and the heavy SDKs (google.cloud, grpc, pydub, groq) are imported when their client is first
+created. The per-module apps (``bot_api:app`` etc.) still work on their own.
+
+Workers share sessions through the session store (SESSION_COORDINATION=shared, the default).
+A deployment with exactly one process may set SESSION_COORDINATION=local to keep sessions in
+a write-behind cache instead.
+"""
+from dotenv import load_dotenv
+
+# Before the route modules are imported: they read their settings from the environment
+load_dotenv(override=True)
+
+from fastapi import FastAPI
+
+import auth_api
+import bot_api
+import evaluation_api
+import main_controller
+import pitch_bot
+import voice_ws
+from clients import lifespan as clients_lifespan
+from metrics import instrument
+from utils import compose_lifespans
+
+# Entered in order and exited in reverse, so the clients outlive everything that uses them
+app = FastAPI(lifespan=compose_lifespans(
+    clients_lifespan,
+    auth_api.lifespan,
+    bot_api.lifespan,
+    evaluation_api.lifespan,
+    main_controller.lifespan,
+    pitch_bot.lifespan,
+))
+app.include_router(auth_api.router)
+app.include_router(bot_api.router)
+app.include_router(evaluation_api.router)
+app.include_router(main_controller.router)
+app.include_router(pitch_bot.router)
+app.include_router(voice_ws.router)
+instrument(app)
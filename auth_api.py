@@ -1,42 +1,67 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Form
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Form
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from typing import Optional
-from passlib.context import CryptContext
+from passwords import PasswordHasher, HasherBusy
 from jose import JWTError, jwt
 import sqlite3
+from sqlite_pool import SQLitePool
 from datetime import datetime, timedelta
 
 SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login", auto_error=False)
 
-app = FastAPI()
+router = APIRouter()
 
 # --- SQLite Setup ---
-DB_PATH = "users.db"
+DB_PATH = os.getenv("AUTH_DB_PATH", "users.db")
+db_pool = SQLitePool(DB_PATH, size=int(os.getenv("AUTH_DB_POOL_SIZE", "8")))
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db_pool.connection()
+
+def _has_unique_index(conn, column: str) -> bool:
+    # Databases created before the explicit indexes have SQLite's UNIQUE autoindexes instead
+    for index in conn.execute("PRAGMA index_list(users)"):
+        if index["unique"]:
+            columns = [c["name"] for c in conn.execute(f"PRAGMA index_info('{index['name']}')")]
+            if columns == [column]:
+                return True
+    return False
 
 def create_user_table():
-    conn = get_db()
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        hashed_password TEXT NOT NULL
-    )
-    """)
-    conn.commit()
-    conn.close()
-create_user_table()
+    with db_pool.transaction() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            email TEXT NOT NULL,
+            hashed_password TEXT NOT NULL
+        )
+        """)
+        for column in ("username", "email"):
+            if not _has_unique_index(conn, column):
+                conn.execute(f"CREATE UNIQUE INDEX idx_users_{column} ON users({column})")
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(create_user_table)
+    try:
+        yield
+    finally:
+        password_hasher.shutdown()
+        db_pool.close()
 
 # --- Models ---
 class User(BaseModel):
@@ -47,41 +72,52 @@ class UserInDB(User):
     hashed_password: str
 
 # --- Utility Functions ---
+def _user_from_row(row) -> UserInDB:
+    return UserInDB(username=row["username"], email=row["email"], hashed_password=row["hashed_password"])
+
 def get_user_by_username(username: str) -> Optional[UserInDB]:
-    conn = get_db()
-    cur = conn.execute("SELECT * FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
-    if row:
-        return UserInDB(username=row["username"], email=row["email"], hashed_password=row["hashed_password"])
-    return None
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT username, email, hashed_password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+    return _user_from_row(row) if row else None
 
 def get_user_by_email(email: str) -> Optional[UserInDB]:
-    conn = get_db()
-    cur = conn.execute("SELECT * FROM users WHERE email = ?", (email,))
-    row = cur.fetchone()
-    conn.close()
-    if row:
-        return UserInDB(username=row["username"], email=row["email"], hashed_password=row["hashed_password"])
-    return None
-
-def create_user(username: str, email: str, password: str):
-    hashed_password = pwd_context.hash(password)
-    conn = get_db()
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT username, email, hashed_password FROM users WHERE email = ?", (email,)
+        ).fetchone()
+    return _user_from_row(row) if row else None
+
+def user_exists(username: str, email: str) -> bool:
+    # One indexed lookup for both columns (SQLite serves the OR from the two unique indexes)
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM users WHERE username = ? OR email = ? LIMIT 1", (username, email)
+        ).fetchone()
+    return row is not None
+
+def insert_user(username: str, email: str, hashed_password: str):
     try:
-        conn.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)", (username, email, hashed_password))
-        conn.commit()
+        # The unique indexes make the insert itself the authoritative duplicate check
+        with db_pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+                (username, email, hashed_password),
+            )
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Username or email already registered.")
-    finally:
-        conn.close()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def authenticate_user(username: str, password: str):
-    user = get_user_by_username(username)
-    if not user or not verify_password(password, user.hashed_password):
+async def hash_or_busy(coro):
+    try:
+        return await coro
+    except HasherBusy:
+        raise HTTPException(status_code=503, detail="Too many authentication requests, please retry.",
+                            headers={"Retry-After": "1"})
+
+async def authenticate_user(username: str, password: str):
+    user = await asyncio.to_thread(get_user_by_username, username)
+    if not user or not await hash_or_busy(password_hasher.verify(password, user.hashed_password)):
         return None
     return user
 
@@ -91,32 +127,93 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# --- Token cache ---
+class TokenCache:
+    """Bounded cache of verified access token → user, valid until the token expires."""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: User, token_exp: float):
+        with self._lock:
+            self._entries[token] = (user, min(token_exp, time.time() + self.ttl))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(
+    max_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300")),
+)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    # Reusable dependency: decode + DB lookup only on a cache miss
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_in_db = await asyncio.to_thread(get_user_by_username, username)
+    if user_in_db is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user = User(username=user_in_db.username, email=user_in_db.email)
+    token_cache.put(token, user, payload["exp"])
+    return user
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[User]:
+    # Same as get_current_user, but requests without a token get None. A token that was sent
+    # and is invalid or expired is still rejected, instead of silently running anonymously.
+    if token is None:
+        return None
+    return await get_current_user(token)
+
 # --- API Endpoints ---
-@app.post("/signup")
-def signup(username: str = Form(...), email: str = Form(...), password: str = Form(...)):
-    if get_user_by_username(username) or get_user_by_email(email):
+@router.post("/signup")
+async def signup(username: str = Form(...), email: str = Form(...), password: str = Form(...)):
+    # Cheap pre-check so duplicates are rejected before paying for bcrypt
+    if await asyncio.to_thread(user_exists, username, email):
         raise HTTPException(status_code=400, detail="Username or email already registered.")
-    create_user(username, email, password)
+    hashed_password = await hash_or_busy(password_hasher.hash(password))
+    await asyncio.to_thread(insert_user, username, email, hashed_password)
     return {"msg": "Signup successful"}
 
-@app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+@router.post("/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/me")
-def read_users_me(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    user = get_user_by_username(username)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return {"username": user.username, "email": user.email} 
\ No newline at end of file
+@router.get("/me")
+async def read_users_me(user: User = Depends(get_current_user)):
+    return {"username": user.username, "email": user.email}
+
+# Standalone app, kept for `uvicorn auth_api:app --env-file .env` (only app.py loads .env itself);
+# the composed application is app.py
+app = FastAPI(lifespan=lifespan)
+app.include_router(router)
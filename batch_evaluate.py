@@ -0,0 +1,150 @@
+"""Re-score stored VC interviews with the current evaluation prompt and model.
+
+    python batch_evaluate.py --concurrency 8
+    python batch_evaluate.py --base-url http://127.0.0.1:9000/v1   # against a local stub LLM
+
+Legacy conversations/*.json files are imported into the session store first. Sessions that
+already have an evaluation for the current prompt version are skipped, and every result is
+written as soon as it arrives, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger("batch_evaluate")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def interview_transcript(conversation):
+    # Everything up to the founder's "exit"; any earlier evaluation is dropped
+    transcript = []
+    for message in conversation:
+        if message["role"] == "user" and message["content"].strip().lower() == "exit":
+            break
+        transcript.append(message)
+    return transcript
+
+
+def retry_delay(error, attempt: int, base: float) -> float:
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return base * (2 ** attempt) * (0.5 + random.random())
+
+
+def is_retryable(error) -> bool:
+    import openai
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+async def evaluate_session(client, session_id, conversation, args, version, evaluation_prompt):
+    import evaluation_store
+    import session_store
+    from prompt_registry import registry as prompt_registry
+
+    messages = interview_transcript(conversation) + [
+        {"role": "user", "content": "exit"},
+        {"role": "user", "content": evaluation_prompt},
+    ]
+    for attempt in range(args.max_retries + 1):
+        try:
+            response = await client.chat.completions.create(messages=messages, model=args.model)
+            break
+        except Exception as e:
+            if attempt == args.max_retries or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt, args.backoff)
+            logger.warning("%s: %s, retrying in %.1fs", session_id, type(e).__name__, delay)
+            await asyncio.sleep(delay)
+
+    usage = response.usage
+    vc_name = prompt_registry.canonical_name(await asyncio.to_thread(session_store.get_vc_name, session_id))
+    await asyncio.to_thread(
+        evaluation_store.save_evaluation,
+        session_id, version, args.model, response.choices[0].message.content.strip(), "batch",
+        usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None, vc_name,
+    )
+
+
+async def run(args):
+    import session_store
+    import evaluation_store
+    from bot_api import evaluation_prompt
+    from clients import registry as clients
+
+    await asyncio.to_thread(session_store.create_session_tables)
+    await asyncio.to_thread(evaluation_store.create_evaluation_tables)
+    imported = await asyncio.to_thread(session_store.import_json_sessions, args.conversations_dir)
+    if imported:
+        logger.info("Imported %d legacy session(s) from %s/", imported, args.conversations_dir)
+
+    version = evaluation_store.prompt_version(evaluation_prompt, args.model)
+    done = set() if args.force else await asyncio.to_thread(evaluation_store.evaluated_sessions, version)
+    session_ids = [s for s in await asyncio.to_thread(session_store.list_sessions) if s not in done]
+    if args.limit:
+        session_ids = session_ids[:args.limit]
+    logger.info("Prompt version %s: %d to evaluate, %d already done", version, len(session_ids), len(done))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    counts = {"evaluated": 0, "skipped": 0, "failed": 0}
+
+    async def one(session_id):
+        async with semaphore:
+            conversation = await asyncio.to_thread(session_store.load_session, session_id)
+            # Nothing to score until the founder has said something
+            if not conversation or not any(m["role"] == "user" for m in interview_transcript(conversation)):
+                counts["skipped"] += 1
+                return
+            try:
+                await evaluate_session(clients.openai, session_id, conversation, args, version, evaluation_prompt)
+                counts["evaluated"] += 1
+                logger.info("%s evaluated", session_id)
+            except Exception as e:
+                counts["failed"] += 1
+                logger.error("%s failed: %s", session_id, e)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(s) for s in session_ids))
+    finally:
+        await clients.close()
+    logger.info("%s in %.1fs", ", ".join(f"{v} {k}" for k, v in counts.items()), time.perf_counter() - start)
+    return counts
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.getenv("VC_MODEL", "gpt-4o-mini"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--backoff", type=float, default=1.0, help="base delay (s) for exponential backoff")
+    parser.add_argument("--limit", type=int, default=0, help="evaluate at most N sessions")
+    parser.add_argument("--force", action="store_true", help="re-evaluate sessions already scored")
+    parser.add_argument("--conversations-dir", default="conversations")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. a local stub")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+    counts = asyncio.run(run(args))
+    raise SystemExit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Signup / login / me throughput for auth_api under concurrent load.
+
+Runs the ASGI app in-process against a throwaway database:
+
+    python benchmarks/auth_bench.py --users 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_phase(name, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(send):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(one(send) for send in requests))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<8} {len(requests) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {percentile(latencies, 95) * 1000:7.1f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  errors {errors}"
+    )
+    return responses
+
+
+async def main(args):
+    import httpx
+    import auth_api
+
+    # ASGITransport does not send lifespan events, so enter the hook directly
+    transport = httpx.ASGITransport(app=auth_api.app)
+    async with auth_api.lifespan(auth_api.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        users = [(f"user{i}", f"user{i}@example.com", f"password-{i}") for i in range(args.users)]
+
+        await run_phase("signup", [
+            lambda u=u: client.post("/signup", data={"username": u[0], "email": u[1], "password": u[2]})
+            for u in users
+        ], args.concurrency)
+
+        responses = await run_phase("login", [
+            lambda u=u: client.post("/login", data={"username": u[0], "password": u[2]})
+            for u in users
+        ], args.concurrency)
+
+        tokens = [r.json()["access_token"] for r in responses if r.status_code == 200]
+        await run_phase("me", [
+            lambda t=t: client.get("/me", headers={"Authorization": f"Bearer {t}"})
+            for t in tokens * args.me_repeat
+        ], args.concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--me-repeat", type=int, default=5, help="/me calls per issued token")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["AUTH_DB_PATH"] = os.path.join(tmp, "bench_users.db")
+        asyncio.run(main(args))
@@ -0,0 +1,113 @@
+"""Cold-start cost: module import time and time until uvicorn workers serve requests.
+
+Each measurement runs in a fresh interpreter. Compare revisions by running it on each:
+
+    python benchmarks/cold_start.py --modules app main_controller bot_api --runs 5 --workers 4
+    python benchmarks/cold_start.py --importtime app   # top self-time imports (python -X importtime)
+
+Workers warm their clients in the lifespan hook, so ``--stubs`` points them at
+benchmarks/stubs.py instead of the real services for a network-independent number.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from loadtest import REPO_ROOT, HERE, free_port, wait_for_http
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def import_seconds(module: str, env: dict) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+                         cwd=REPO_ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def ready_seconds(module: str, workers: int, env: dict) -> float:
+    # From process spawn until /openapi.json answers, i.e. a worker finished its lifespan startup
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", f"{module}:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ], cwd=REPO_ROOT, env=env)
+    try:
+        wait_for_http(f"http://127.0.0.1:{port}/openapi.json")
+        return time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def top_imports(module: str, env: dict, limit: int = 15):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, env=env, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(.+)", line)
+        if match:
+            rows.append((int(match.group(2)), int(match.group(1)), match.group(4).strip()))
+    for cumulative, own, name in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:9.1f} ms cumulative {own / 1000:9.1f} ms self  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["app"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-serve", action="store_true", help="only measure import time")
+    parser.add_argument("--stubs", action="store_true", help="warm up against benchmarks/stubs.py")
+    parser.add_argument("--importtime", metavar="MODULE", help="print the slowest imports of MODULE and exit")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+            "AUTH_DB_PATH": os.path.join(workdir, "users.db"),
+            "EVALUATION_DB_PATH": os.path.join(workdir, "evaluations.db"),
+            "PITCH_JOB_DB_PATH": os.path.join(workdir, "pitch_jobs.db"),
+            "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"),
+        }
+        if args.importtime:
+            top_imports(args.importtime, env)
+            return
+
+        stubs = None
+        if args.stubs:
+            http_port, grpc_port = free_port(), free_port()
+            stubs = subprocess.Popen([sys.executable, os.path.join(HERE, "stubs.py"),
+                                      "--http-port", str(http_port), "--grpc-port", str(grpc_port)], cwd=REPO_ROOT)
+            wait_for_http(f"http://127.0.0.1:{http_port}/stats")
+            env.update({
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{http_port}/v1",
+                "OPENAI_API_KEY": "stub",
+                "SPEECH_API_ENDPOINT": f"127.0.0.1:{grpc_port}",
+                "TTS_API_ENDPOINT": f"127.0.0.1:{grpc_port}",
+                "GOOGLE_INSECURE_ENDPOINTS": "1",
+            })
+
+        try:
+            print(f"{'module':<18} {'import p50':>11} {'import max':>11} {'ready p50':>10} {'ready max':>10}  (s)")
+            for module in args.modules:
+                imports = [import_seconds(module, env) for _ in range(args.runs)]
+                line = f"{module:<18} {statistics.median(imports):>11.3f} {max(imports):>11.3f}"
+                if not args.no_serve:
+                    ready = [ready_seconds(module, args.workers, env) for _ in range(args.runs)]
+                    line += f" {statistics.median(ready):>10.3f} {max(ready):>10.3f}"
+                print(line)
+        finally:
+            if stubs is not None:
+                stubs.terminate()
+                stubs.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
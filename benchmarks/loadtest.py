@@ -0,0 +1,291 @@
+"""Load test the VC, pitch and auth APIs against local stubs for LLM, STT and TTS.
+
+Starts benchmarks/stubs.py and the API (app:app) under uvicorn with their clients pointed at the stubs,
+drives complete interviews (audio pitch -> N answers -> exit) using the sample MP3s in
+temp_inputs/, and reports throughput and p50/p95/p99 per endpoint and per backend stage.
+
+    python benchmarks/loadtest.py --sessions 50 --concurrency 10 --questions 3
+    python benchmarks/loadtest.py --sessions 20 --stream --pitch-jobs 10 --auth-users 20 --json report.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+VC_NAMES = ["Kevin", "Barbara", "Mark", "Lori", "Robert", "Daymmond"]
+
+# Route modules driven by this benchmark; served by the composed app:app unless --separate-apps
+APPS = ["main_controller", "bot_api", "pitch_bot", "auth_api"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def timed(self, name, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[name] += 1
+            self.latencies[name].append(time.perf_counter() - start)
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def record(self, name, seconds):
+        self.latencies[name].append(seconds)
+
+
+def wait_for_http(url: str, timeout: float = 60.0):
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_processes(args, workdir):
+    http_port, grpc_port = free_port(), free_port()
+    procs = [subprocess.Popen([
+        sys.executable, os.path.join(HERE, "stubs.py"),
+        "--http-port", str(http_port), "--grpc-port", str(grpc_port),
+        "--llm-ttft", str(args.llm_ttft), "--llm-tokens-per-second", str(args.llm_tokens_per_second),
+        "--stt-latency", str(args.stt_latency), "--stt-realtime-factor", str(args.stt_realtime_factor),
+        "--tts-latency", str(args.tts_latency),
+    ], cwd=REPO_ROOT)]
+    stub_url = f"http://127.0.0.1:{http_port}"
+    wait_for_http(f"{stub_url}/stats")
+
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_KEY": "stub",
+        "GROQ_BASE_URL": stub_url,
+        "GROQ_API_KEY": "stub",
+        "SPEECH_API_ENDPOINT": f"127.0.0.1:{grpc_port}",
+        "TTS_API_ENDPOINT": f"127.0.0.1:{grpc_port}",
+        "GOOGLE_INSECURE_ENDPOINTS": "1",
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "EVALUATION_DB_PATH": os.path.join(workdir, "evaluations.db"),
+        "AUTH_DB_PATH": os.path.join(workdir, "users.db"),
+        "PITCH_JOB_DB_PATH": os.path.join(workdir, "pitch_jobs.db"),
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"),
+        # Several processes (workers, or --separate-apps serving one interview) must share sessions
+        # through the store (leases, write-through); a single process can keep them write-behind
+        "SESSION_COORDINATION": "shared" if args.separate_apps or args.workers > 1 else "local",
+    }
+    urls = {}
+    for module in (APPS if args.separate_apps else ["app"]):
+        port = free_port()
+        procs.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", f"{module}:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning",
+        ], cwd=REPO_ROOT, env=env))
+        urls[module] = f"http://127.0.0.1:{port}"
+    for url in set(urls.values()):
+        wait_for_http(f"{url}/openapi.json")
+    if not args.separate_apps:
+        urls = {module: urls["app"] for module in APPS}
+    return procs, stub_url, urls
+
+
+async def interview(client, urls, recorder, clips, args):
+    session_id = uuid.uuid4().hex
+    vc_name = random.choice(VC_NAMES)
+
+    async def audio_turn(name):
+        clip_name, clip = random.choice(clips)
+        endpoint = "/vc/audio-pitch/stream" if args.stream else "/vc/audio-pitch"
+        await recorder.timed(f"POST {endpoint} ({name})", client.post(
+            urls["main_controller"] + endpoint,
+            files={"audio_file": (clip_name, clip, "audio/mpeg")},
+            data={"session_id": session_id, "vc_name": vc_name},
+        ))
+
+    async def text_turn(name, message):
+        payload = {"session_id": session_id, "vc_name": vc_name, "message": message}
+        if not args.stream:
+            await recorder.timed(f"POST /vc/message ({name})", client.post(urls["bot_api"] + "/vc/message", json=payload))
+            return
+        start = time.perf_counter()
+        try:
+            async with client.stream("POST", urls["bot_api"] + "/vc/message/stream", json=payload) as response:
+                first = None
+                async for _ in response.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - start
+                recorder.record(f"POST /vc/message/stream ({name}) first byte", first or 0.0)
+                recorder.record(f"POST /vc/message/stream ({name})", time.perf_counter() - start)
+        except Exception:
+            recorder.errors[f"POST /vc/message/stream ({name})"] += 1
+
+    await audio_turn("pitch")
+    for _ in range(args.questions):
+        if args.text_answers:
+            await text_turn("answer", "Our CAC is $200 and payback is 4 months through partner clinics.")
+        else:
+            await audio_turn("answer")
+    await text_turn("exit", "exit")
+
+
+async def pitch_job(client, urls, recorder):
+    await recorder.timed("POST /generate-pitch (wait)", client.post(urls["pitch_bot"] + "/generate-pitch", data={
+        "core_business_info": f"Telemedicine marketplace for rural clinics #{uuid.uuid4().hex[:8]}",
+        "traction_validation": "40 clinics, $30k MRR, growing 15% month over month",
+        "wait": "true",
+    }))
+
+
+async def auth_user(client, urls, recorder):
+    name = f"bench{uuid.uuid4().hex[:10]}"
+    await recorder.timed("POST /signup", client.post(urls["auth_api"] + "/signup", data={
+        "username": name, "email": f"{name}@example.com", "password": "bench-password"}))
+    response = await recorder.timed("POST /login", client.post(urls["auth_api"] + "/login", data={
+        "username": name, "password": "bench-password"}))
+    if response is not None and response.status_code == 200:
+        token = response.json()["access_token"]
+        for _ in range(5):
+            await recorder.timed("GET /me", client.get(urls["auth_api"] + "/me",
+                                                       headers={"Authorization": f"Bearer {token}"}))
+
+
+async def drive(args, stub_url, urls):
+    import httpx
+
+    clips = [(os.path.basename(p), open(p, "rb").read()) for p in sorted(glob.glob(os.path.join(REPO_ROOT, "temp_inputs", "*.mp3")))]
+    if not clips:
+        raise SystemExit("No sample MP3s found in temp_inputs/")
+
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+
+    async def bounded(coro):
+        async with semaphore:
+            await coro
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await client.delete(f"{stub_url}/stats")
+        jobs = [interview(client, urls, recorder, clips, args) for _ in range(args.sessions)]
+        jobs += [pitch_job(client, urls, recorder) for _ in range(args.pitch_jobs)]
+        jobs += [auth_user(client, urls, recorder) for _ in range(args.auth_users)]
+        random.shuffle(jobs)
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(job) for job in jobs))
+        elapsed = time.perf_counter() - start
+        stub_stats = (await client.get(f"{stub_url}/stats")).json()
+    return recorder, elapsed, stub_stats
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def report(recorder, elapsed, stub_stats):
+    result = {"elapsed_s": elapsed, "endpoints": {}, "stages": {}, "counters": stub_stats["counters"]}
+    print(f"\n{'endpoint':<48} {'n':>5} {'err':>4} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for name in sorted(recorder.latencies):
+        summary = summarize(recorder.latencies[name])
+        summary["errors"] = recorder.errors[name]
+        summary["rps"] = summary["count"] / elapsed if elapsed else 0.0
+        result["endpoints"][name] = summary
+        print(f"{name:<48} {summary['count']:>5} {summary['errors']:>4} {summary['rps']:>7.2f} "
+              f"{summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}")
+
+    print(f"\n{'stage (seen by stubs)':<48} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for name in sorted(stub_stats["samples"]):
+        summary = summarize(stub_stats["samples"][name])
+        result["stages"][name] = summary
+        print(f"{name:<48} {summary['count']:>5} {summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f}")
+    print(f"\nwall time {elapsed:.1f}s; counters {json.dumps(stub_stats['counters'])}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=3, help="answers per interview before exit")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per app")
+    parser.add_argument("--separate-apps", action="store_true",
+                        help="run the per-module apps in their own processes instead of app:app")
+    parser.add_argument("--stream", action="store_true", help="use the streaming endpoints")
+    parser.add_argument("--text-answers", action="store_true", help="answer via /vc/message instead of audio")
+    parser.add_argument("--pitch-jobs", type=int, default=0)
+    parser.add_argument("--auth-users", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--llm-ttft", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--stt-latency", type=float, default=0.2)
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--fail-p95-ms", type=float, default=0.0,
+                        help="exit non-zero if any endpoint p95 exceeds this (regression gate)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        procs, stub_url, urls = start_processes(args, workdir)
+        try:
+            recorder, elapsed, stub_stats = asyncio.run(drive(args, stub_url, urls))
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait(timeout=30)
+
+    result = report(recorder, elapsed, stub_stats)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failed = sum(recorder.errors.values()) > 0
+    if args.fail_p95_ms:
+        slow = [n for n, s in result["endpoints"].items() if s["p95_ms"] > args.fail_p95_ms]
+        for name in slow:
+            print(f"p95 regression: {name} {result['endpoints'][name]['p95_ms']:.1f} ms > {args.fail_p95_ms} ms")
+        failed = failed or bool(slow)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Local stand-ins for the paid services, for load tests and end-to-end runs.
+
+- OpenAI / Groq chat completions over HTTP (``/v1/...`` and Groq's ``/openai/v1/...``),
+  streaming and non-streaming, with configurable time-to-first-token and token rate
+- Google Speech ``StreamingRecognize`` and Text-to-Speech ``SynthesizeSpeech`` over gRPC
+
+    python benchmarks/stubs.py --http-port 9100 --grpc-port 9101 --llm-ttft 0.3
+
+Per-stage latencies observed by the stubs are served as JSON at ``GET /stats``.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent import futures
+
+# A single silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz) — enough for players to accept
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+VC_REPLY = (
+    "Thanks for walking me through that. Your numbers look promising, but I want to understand "
+    "the economics better. What does it cost you to acquire a customer, and how long until that "
+    "customer pays back the acquisition cost? Be specific about the channels you rely on."
+)
+
+EVALUATION_REPLY = (
+    "1. Score: 7/10\n"
+    "2. Strengths:\n- Clear problem statement\n- Strong early traction\n"
+    "3. Areas for improvement:\n- Unit economics need detail\n- Competitive moat is thin\n"
+    "4. Final Verdict: Needs Work"
+)
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"samples": {k: list(v) for k, v in self.samples.items()}, "counters": dict(self.counters)}
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.counters.clear()
+
+
+stats = Stats()
+
+
+# --- LLM (OpenAI-compatible HTTP) ---
+def create_llm_app(ttft: float, tokens_per_second: float, jitter: float = 0.0):
+    import random
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    def reply_for(messages) -> str:
+        last = messages[-1]["content"] if messages else ""
+        return EVALUATION_REPLY if "evaluation" in last.lower() else VC_REPLY
+
+    def usage(messages, text):
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        completion_tokens = len(text) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @app.get("/v1/models")
+    @app.get("/openai/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages, model = body.get("messages", []), body.get("model", "stub")
+        text = reply_for(messages)
+        words = text.split(" ")
+        delay = ttft * (1 + random.uniform(-jitter, jitter))
+        created, completion_id = int(time.time()), f"chatcmpl-{uuid.uuid4().hex}"
+        start = time.perf_counter()
+        stats.count("llm_requests")
+        stats.count("llm_prompt_chars", sum(len(m.get("content") or "") for m in messages))
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay + len(words) / tokens_per_second)
+            stats.observe("llm", time.perf_counter() - start)
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": usage(messages, text),
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        async def events():
+            await asyncio.sleep(delay)
+            stats.observe("llm_ttft", time.perf_counter() - start)
+            for i, word in enumerate(words):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                      "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(1 / tokens_per_second)
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            if include_usage:
+                yield f"data: {json.dumps({**final, 'choices': [], 'usage': usage(messages, text)})}\n\n"
+            yield "data: [DONE]\n\n"
+            stats.observe("llm", time.perf_counter() - start)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    @app.delete("/stats")
+    async def reset_stats():
+        stats.reset()
+        return {"ok": True}
+
+    return app
+
+
+# --- Google Speech / TTS (gRPC) ---
+def create_grpc_server(port: int, stt_latency: float, stt_realtime_factor: float, tts_latency: float,
+                       max_workers: int = 256):
+    import grpc
+    from google.cloud import speech, texttospeech
+
+    def streaming_recognize(request_iterator, context):
+        start = time.perf_counter()
+        audio_bytes = 0
+        for request in request_iterator:
+            audio_bytes += len(request.audio_content)
+        audio_seconds = audio_bytes / (16000 * 2)
+        time.sleep(stt_latency + audio_seconds * stt_realtime_factor)
+        stats.observe("stt", time.perf_counter() - start)
+        stats.count("stt_audio_bytes", audio_bytes)
+        yield speech.StreamingRecognizeResponse(results=[
+            speech.StreamingRecognitionResult(
+                is_final=True,
+                alternatives=[speech.SpeechRecognitionAlternative(
+                    transcript="We help small clinics book specialist consultations online.", confidence=0.9)],
+            )
+        ])
+
+    def synthesize_speech(request, context):
+        start = time.perf_counter()
+        time.sleep(tts_latency)
+        # Roughly one frame (26 ms) per character keeps payload size proportional to text length
+        frames = max(1, len(request.input.text) // 4)
+        stats.observe("tts", time.perf_counter() - start)
+        stats.count("tts_chars", len(request.input.text))
+        return texttospeech.SynthesizeSpeechResponse(audio_content=SILENT_MP3_FRAME * frames)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    server.add_generic_rpc_handlers((
+        grpc.method_handlers_generic_handler("google.cloud.speech.v1.Speech", {
+            "StreamingRecognize": grpc.stream_stream_rpc_method_handler(
+                streaming_recognize,
+                request_deserializer=speech.StreamingRecognizeRequest.deserialize,
+                response_serializer=speech.StreamingRecognizeResponse.serialize,
+            ),
+        }),
+        grpc.method_handlers_generic_handler("google.cloud.texttospeech.v1.TextToSpeech", {
+            "SynthesizeSpeech": grpc.unary_unary_rpc_method_handler(
+                synthesize_speech,
+                request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+                response_serializer=texttospeech.SynthesizeSpeechResponse.serialize,
+            ),
+        }),
+    ))
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--http-port", type=int, default=9100)
+    parser.add_argument("--grpc-port", type=int, default=9101)
+    parser.add_argument("--llm-ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="relative +/- jitter on TTFT")
+    parser.add_argument("--stt-latency", type=float, default=0.2, help="fixed seconds after end of audio")
+    parser.add_argument("--stt-realtime-factor", type=float, default=0.0,
+                        help="extra seconds per second of audio (1.0 = real time)")
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    grpc_server = create_grpc_server(args.grpc_port, args.stt_latency, args.stt_realtime_factor, args.tts_latency)
+    grpc_server.start()
+    try:
+        uvicorn.run(create_llm_app(args.llm_ttft, args.llm_tokens_per_second, args.llm_jitter),
+                    host="127.0.0.1", port=args.http_port, log_level="warning")
+    finally:
+        grpc_server.stop(grace=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,29 @@
 import os
 import json
+import time
 import uuid
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict
-from dotenv import load_dotenv
-from groq import Groq
-from openai import OpenAI
+import session_store
+import evaluation_store
+from session_cache import SessionCache, SessionBusy, EVALUATED
+from context_window import ContextWindow, SUMMARY_MAX_TOKENS
+from prompt_registry import registry as prompt_registry
+from clients import lifespan as clients_lifespan
+from llm_router import router as llm
+from metrics import instrument, observe_stage, record_usage, timed
+import auth_api
+from auth_api import User, get_optional_user
+from utils import compose_lifespans
 
-# Load environment variables
-load_dotenv(override=True)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
-# Create folder for conversation history
-os.makedirs("conversations", exist_ok=True)
-
-app = FastAPI()
-
-with open("questions.txt", "r", encoding="utf-8") as f:
-    sample_questions = f.read().strip()
-
-with open("sample_pitches.txt", "r", encoding="utf-8") as f:
-    sample_pitches = f.read().strip()
+router = APIRouter()
 
 evaluation_prompt = """
 You are now done asking questions. Based on the entire conversation so far, give a comprehensive evaluation:
@@ -34,8 +36,22 @@ You are now done asking questions. Based on the entire conversation so far, give
 Make it concise, insightful, and professional.
 """
 
-# In-memory cache: session_id → conversation
-session_data: Dict[str, Dict] = {}
+summary_prompt = """
+You maintain a running summary of a VC pitch interview. Merge the new turns into the current
+summary. Keep every concrete fact the founder stated (numbers, customers, team, market, funding)
+and every question the VC already asked, so they are not asked again. Be terse; no preamble.
+"""
+
+# The final evaluation sees the whole transcript unless this is turned off
+EVALUATION_FULL_TRANSCRIPT = os.getenv("EVALUATION_FULL_TRANSCRIPT", "1") == "1"
+
+# Bank questions suggested to the VC per turn (QUESTION_BANK_MODE=retrieve)
+QUESTION_SUGGESTIONS_K = int(os.getenv("QUESTION_SUGGESTIONS_K", "5"))
+
+SESSION_ENDED_MESSAGE = "Session already ended. Please restart."
+
+# In-memory cache: session_id → live session, flushed to session_store in the background
+session_cache = SessionCache(evaluated_marker=evaluation_prompt)
 
 class UserInput(BaseModel):
     message: str
@@ -43,116 +59,252 @@ class UserInput(BaseModel):
     vc_name: str = "Default"  # Optional; defaults to "Default"
 
 def get_system_prompt(vc_name: str):
-    vc_file_path = f"vc_personalities/{vc_name.lower()}.txt"
-    if os.path.exists(vc_file_path):
-        with open(vc_file_path, "r", encoding="utf-8") as f:
-            vc_personality_description = f.read().strip()
-    else:
-        vc_personality_description = "You are a seasoned and thoughtful VC."  # Fallback
-
-    return f"""
-You are a seasoned Venture Capitalist (VC) with expertise in evaluating startup pitches.
-Your personality: {vc_name}
-{vc_personality_description}
-
-Your job is to:
-1. Carefully analyze the founder's pitch.
-2. Ask insightful, high-quality questions one at a time.
-3. Wait for the founder's answer before asking the next question.
-4. End the session when you're satisfied or the founder types "exit".
-5. Don't ask very long questions. Ask one question at a time only — strictly.
-6. After the Q&A ends, evaluate the pitch and answers:
-   - Give a score out of 10.
-   - List 2-3 strengths.
-   - List 2-3 areas for improvement.
-   - Conclude with a final verdict: Invest / Needs Work / Pass.
-
-Be thoughtful, critical, and constructive. Ask follow-ups if needed.
-
-Below are examples of good questions you may be inspired by:
------
-{sample_questions}
------
-
-And here are some example founder pitches to guide your expectations:
------
-{sample_pitches}
------
-
-Now, begin the session.
-"""
+    return prompt_registry.system_prompt(vc_name)
 
-def load_session(session_id: str):
-    path = f"conversations/{session_id}.json"
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
-    else:
-        return None
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(prompt_registry.load)
+    await asyncio.to_thread(session_store.create_session_tables)
+    await asyncio.to_thread(evaluation_store.create_evaluation_tables)
+    session_cache.start()
+    try:
+        yield
+    finally:
+        # Flush pending session writes before the worker exits
+        await session_cache.close()
 
-def save_session(session_id: str, conversation):
-    with open(f"conversations/{session_id}.json", "w") as f:
-        json.dump(conversation, f, indent=2)
+@asynccontextmanager
+async def session_turn(session_id: str):
+    # One turn per session at a time, across workers in shared mode (see SessionCache.turn)
+    try:
+        async with session_cache.turn(session_id):
+            yield
+    except SessionBusy:
+        raise HTTPException(status_code=409, detail="Another turn for this session is in progress.",
+                            headers={"Retry-After": "1"})
+    except session_store.SessionConflict:
+        raise HTTPException(status_code=409, detail="The session was changed by another request, please retry.")
 
-@app.post("/vc/message")
-def vc_qna(user_input: UserInput):
+async def begin_turn(user_input: UserInput):
+    """Load the session and append the founder's message.
+
+    Returns ``(conversation, done)``; ``conversation`` is None when the session has already ended.
+    """
     session_id = user_input.session_id
     message = user_input.message.strip()
     vc_name = user_input.vc_name.strip() if user_input.vc_name else "Default"
 
     # Load or initialize conversation
-    conversation = load_session(session_id)
-    if not conversation:
+    entry = await session_cache.get(session_id)
+    if entry is None:
         system_prompt = get_system_prompt(vc_name)
         conversation = [{"role": "system", "content": system_prompt}]
-
-    # Check if session already completed
-    if conversation and any(m["content"] == evaluation_prompt for m in conversation):
-        return {"message": "Session already ended. Please restart."}
+    elif entry.state == EVALUATED:
+        # Check if session already completed
+        return None, None
+    else:
+        # Work on a copy so a failed LLM call leaves the cached session untouched
+        conversation = list(entry.messages)
 
     # If "exit", trigger evaluation
     if message.lower() == "exit":
         conversation.append({"role": "user", "content": "exit"})
         conversation.append({"role": "user", "content": evaluation_prompt})
+        return conversation, True
 
-        response = client.chat.completions.create(
-            messages=conversation,
-            model="gpt-4o-mini"
+    # Add user input
+    conversation.append({"role": "user", "content": message})
+    return conversation, False
+
+async def save_evaluation(session_id: str, vc_name: Optional[str], evaluation: str, model: Optional[str], usage,
+                          username: Optional[str]):
+    # Indexed copy of the final evaluation for dashboards; the session keeps the full text too.
+    # Versioned by the configured model so live and batch evaluations of the same prompt match.
+    model = llm.configured_model(model)
+    try:
+        await asyncio.to_thread(
+            evaluation_store.save_evaluation,
+            session_id, evaluation_store.prompt_version(evaluation_prompt, model), model, evaluation,
+            "live", usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None,
+            prompt_registry.canonical_name(vc_name), username,
         )
-        reply = response.choices[0].message.content.strip()
-        conversation.append({"role": "assistant", "content": reply})
-        save_session(session_id, conversation)
+    except Exception:
+        logger.exception("Saving the evaluation of session %s failed", session_id)
+
+async def finish_turn(user_input: UserInput, conversation, reply: str, done: bool,
+                      model: Optional[str] = None, usage=None, username: Optional[str] = None):
+    conversation.append({"role": "assistant", "content": reply})
+
+    # Update the cached conversation; it is persisted by the write-behind flusher
+    entry = session_cache.update(user_input.session_id, conversation, user_input.vc_name, evaluated=done)
+    if not done:
+        category = prompt_registry.get_question_bank().categorize(reply)
+        if category:
+            covered_categories(entry).add(category)
 
+    if done:
+        # The personality the session was started with, not the one named in the "exit" request
+        await save_evaluation(user_input.session_id, entry.vc_name, reply, model, usage, username)
         return {
             "message": "Q&A complete. Here's your final evaluation:",
             "evaluation": reply,
             "done": True
         }
-
-    # Add user input
-    conversation.append({"role": "user", "content": message})
-
-    # Get assistant reply
-    response = client.chat.completions.create(
-        messages=conversation,
-        model="gpt-4o-mini"
-    )
-    reply = response.choices[0].message.content.strip()
-    conversation.append({"role": "assistant", "content": reply})
-
-    # Save updated conversation
-    save_session(session_id, conversation)
-
     return {
         "message": reply,
         "done": False
     }
 
-@app.post("/vc/reset")
-def reset_session(user_input: UserInput):
+async def summarize_turns(summary: str, messages):
+    transcript = "\n".join(
+        f"{'Founder' if m['role'] == 'user' else 'VC'}: {m['content']}" for m in messages
+    )
+    with timed("llm_summary"):
+        response = await llm.create(
+            messages=[
+                {"role": "system", "content": summary_prompt},
+                {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS
+        )
+    record_usage("summary", response.usage)
+    return response.choices[0].message.content.strip()
+
+context_window = ContextWindow(summarize=summarize_turns)
+
+def covered_categories(entry) -> set:
+    if entry is None:
+        return set()
+    if entry.covered_categories is None:
+        # Sessions loaded from the store: derive coverage once from the VC's past questions
+        bank = prompt_registry.get_question_bank()
+        entry.covered_categories = bank.covered_categories(
+            m["content"] for m in entry.messages if m["role"] == "assistant"
+        )
+    return entry.covered_categories
+
+def question_suggestions(entry, founder_message: str):
+    # Ephemeral per-turn hint with the most relevant bank questions; never persisted
+    bank = prompt_registry.get_question_bank()
+    covered = covered_categories(entry)
+    questions = bank.suggest(founder_message, covered, k=QUESTION_SUGGESTIONS_K)
+    uncovered = [c for c in bank.categories if c not in covered]
+    content = "Question-bank suggestions for your next question"
+    if uncovered:
+        content += f" (topics not covered yet: {', '.join(uncovered)})"
+    return {"role": "system", "content": content + ":\n" + bank.render(questions)}
+
+async def prompt_messages(session_id: str, conversation, done: bool):
+    # Messages actually sent to the LLM for this turn, trimmed to the context budget
+    if done and EVALUATION_FULL_TRANSCRIPT:
+        return conversation
+    entry = session_cache.peek(session_id)
+    summary, summarized_upto = (entry.summary, entry.summarized_upto) if entry else ("", 1)
+    messages, summary, summarized_upto = await context_window.build(conversation, summary, summarized_upto)
+    if entry is not None:
+        entry.summary, entry.summarized_upto = summary, summarized_upto
+    if not done and prompt_registry.retrieves_questions:
+        messages = messages + [question_suggestions(entry, conversation[-1]["content"])]
+    return messages
+
+async def stream_vc_turn(user_input: UserInput, username: Optional[str] = None):
+    """Async generator behind the streaming endpoints.
+
+    Yields ``{"token": ...}`` for every content delta, then one final event shaped like the
+    ``/vc/message`` response. The assistant message is only persisted once the stream completes.
+    The session stays locked for the whole stream.
+    """
+    async with session_turn(user_input.session_id):
+        conversation, done = await begin_turn(user_input)
+        if conversation is None:
+            yield {"message": SESSION_ENDED_MESSAGE}
+            return
+
+        messages = await prompt_messages(user_input.session_id, conversation, done)
+        start = time.perf_counter()
+        parts = []
+        model = usage = None
+        async for chunk in llm.stream(messages, stream_options={"include_usage": True}):
+            model = model or getattr(chunk, "model", None)
+            # Only OpenAI reports usage on streams (final chunk); other providers' chunks lack the field
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+                record_usage("evaluation" if done else "turn", usage)
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if not parts:
+                    observe_stage("llm_first_token", time.perf_counter() - start)
+                parts.append(token)
+                yield {"token": token}
+        observe_stage("llm", time.perf_counter() - start)
+
+        reply = "".join(parts).strip()
+        yield await finish_turn(user_input, conversation, reply, done, model, usage, username)
+
+async def started(events):
+    """Wait for the first event of ``stream_vc_turn`` before a response is started.
+
+    Waiting for the session lock happens there, so a busy session is still answered with a
+    409 instead of a stream that breaks off. Returns an iterator over all events.
+    """
+    first = await events.__anext__()
+
+    async def replay():
+        try:
+            yield first
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+    return replay()
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+@router.post("/vc/message")
+async def vc_qna(user_input: UserInput, user: Optional[User] = Depends(get_optional_user)):
+    async with session_turn(user_input.session_id):
+        conversation, done = await begin_turn(user_input)
+        if conversation is None:
+            return {"message": SESSION_ENDED_MESSAGE}
+
+        # Get assistant reply (the final evaluation on the "exit" path)
+        messages = await prompt_messages(user_input.session_id, conversation, done)
+        with timed("llm"):
+            response = await llm.create(messages)
+        record_usage("evaluation" if done else "turn", response.usage)
+        reply = response.choices[0].message.content.strip()
+        return await finish_turn(user_input, conversation, reply, done, response.model, response.usage,
+                                 user.username if user else None)
+
+@router.post("/vc/message/stream")
+async def vc_qna_stream(user_input: UserInput, user: Optional[User] = Depends(get_optional_user)):
+    events = await started(stream_vc_turn(user_input, user.username if user else None))
+
+    async def event_stream():
+        async for event in events:
+            yield _sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/vc/reset")
+async def reset_session(user_input: UserInput):
     session_id = user_input.session_id
     vc_name = user_input.vc_name.strip() if user_input.vc_name else "Default"
     system_prompt = get_system_prompt(vc_name)
-    conversation = [{"role": "system", "content": system_prompt}]
-    save_session(session_id, conversation)
+    async with session_turn(session_id):
+        session_cache.reset(session_id, system_prompt, vc_name)
     return {"message": f"Session '{session_id}' reset with personality '{vc_name}'."}
+
+# Standalone app, kept for `uvicorn bot_api:app --env-file .env` (only app.py loads .env itself);
+# the composed application is app.py
+app = FastAPI(lifespan=compose_lifespans(clients_lifespan, auth_api.lifespan, lifespan))
+app.include_router(router)
+instrument(app)
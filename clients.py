@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+# groq, grpc and the Google SDKs are slow to import; they are loaded the first time a
+# client that needs them is created, so importing the app (and spawning workers) stays fast
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+    from google.cloud import speech, texttospeech
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class ClientRegistry:
+    """Process-wide LLM, Speech and TTS clients.
+
+    Every client is created once (lazily, or eagerly by ``startup``) and reused by all
+    requests, so HTTP connection pools and gRPC channels are shared instead of being rebuilt
+    per call. Pool sizes and timeouts come from the environment:
+
+    - ``HTTP_MAX_CONNECTIONS`` / ``HTTP_MAX_KEEPALIVE`` / ``HTTP_KEEPALIVE_EXPIRY``
+    - ``HTTP_TIMEOUT`` / ``HTTP_CONNECT_TIMEOUT``
+    - ``GRPC_KEEPALIVE_MS`` / ``WARMUP_TIMEOUT``
+    - ``SPEECH_API_ENDPOINT`` / ``TTS_API_ENDPOINT`` with ``GOOGLE_INSECURE_ENDPOINTS=1`` to
+      point the Google clients at local stand-ins (see benchmarks/stubs.py)
+    """
+
+    def __init__(self):
+        self._openai: Optional[AsyncOpenAI] = None
+        self._groq: Optional["AsyncGroq"] = None
+        self._speech: Optional["speech.SpeechClient"] = None
+        self._speech_async: Optional["speech.SpeechAsyncClient"] = None
+        self._tts: Optional["texttospeech.TextToSpeechAsyncClient"] = None
+        self._tts_sync: Optional["texttospeech.TextToSpeechClient"] = None
+
+    # --- Configuration ---
+    def _http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=_env_int("HTTP_MAX_CONNECTIONS", 100),
+                max_keepalive_connections=_env_int("HTTP_MAX_KEEPALIVE", 20),
+                keepalive_expiry=_env_float("HTTP_KEEPALIVE_EXPIRY", 30.0),
+            ),
+            timeout=httpx.Timeout(_env_float("HTTP_TIMEOUT", 60.0), connect=_env_float("HTTP_CONNECT_TIMEOUT", 5.0)),
+        )
+
+    def _grpc_options(self):
+        keepalive_ms = _env_int("GRPC_KEEPALIVE_MS", 30000)
+        return [
+            ("grpc.keepalive_time_ms", keepalive_ms),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.max_receive_message_length", 32 * 1024 * 1024),
+        ]
+
+    def _grpc_channel(self, transport_class, endpoint_env: str, aio: bool = False):
+        import grpc
+        import grpc.aio
+
+        endpoint = os.getenv(endpoint_env)
+        if endpoint and os.getenv("GOOGLE_INSECURE_ENDPOINTS") == "1":
+            factory = grpc.aio.insecure_channel if aio else grpc.insecure_channel
+            return factory(endpoint, options=self._grpc_options())
+        if endpoint:
+            return transport_class.create_channel(host=endpoint, options=self._grpc_options())
+        return transport_class.create_channel(options=self._grpc_options())
+
+    # --- Clients ---
+    @property
+    def openai(self) -> AsyncOpenAI:
+        if self._openai is None:
+            self._openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=self._http_client())
+        return self._openai
+
+    @property
+    def groq(self) -> "AsyncGroq":
+        if self._groq is None:
+            from groq import AsyncGroq
+            self._groq = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=self._http_client())
+        return self._groq
+
+    @property
+    def speech(self) -> "speech.SpeechClient":
+        # Synchronous: streaming recognition runs on the STT executor threads
+        if self._speech is None:
+            from google.cloud import speech
+            from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
+            channel = self._grpc_channel(SpeechGrpcTransport, "SPEECH_API_ENDPOINT")
+            self._speech = speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
+        return self._speech
+
+    @property
+    def speech_async(self) -> "speech.SpeechAsyncClient":
+        # Live recognition for the voice WebSocket; created on first use
+        if self._speech_async is None:
+            from google.cloud import speech
+            from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport
+            channel = self._grpc_channel(SpeechGrpcAsyncIOTransport, "SPEECH_API_ENDPOINT", aio=True)
+            self._speech_async = speech.SpeechAsyncClient(transport=SpeechGrpcAsyncIOTransport(channel=channel))
+        return self._speech_async
+
+    @property
+    def tts(self) -> "texttospeech.TextToSpeechAsyncClient":
+        # grpc.aio channels are bound to the event loop they are created on
+        if self._tts is None:
+            from google.cloud import texttospeech
+            from google.cloud.texttospeech_v1.services.text_to_speech.transports import (
+                TextToSpeechGrpcAsyncIOTransport,
+            )
+            channel = self._grpc_channel(TextToSpeechGrpcAsyncIOTransport, "TTS_API_ENDPOINT", aio=True)
+            self._tts = texttospeech.TextToSpeechAsyncClient(transport=TextToSpeechGrpcAsyncIOTransport(channel=channel))
+        return self._tts
+
+    @property
+    def tts_sync(self) -> "texttospeech.TextToSpeechClient":
+        if self._tts_sync is None:
+            from google.cloud import texttospeech
+            from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+            channel = self._grpc_channel(TextToSpeechGrpcTransport, "TTS_API_ENDPOINT")
+            self._tts_sync = texttospeech.TextToSpeechClient(transport=TextToSpeechGrpcTransport(channel=channel))
+        return self._tts_sync
+
+    # --- Lifecycle ---
+    async def startup(self, warm_up: bool = True):
+        # Touch each client the API uses so it exists before the first request; Groq is only
+        # used by the command-line tools and stays unloaded
+        for name in ("openai", "tts", "speech"):
+            getattr(self, name)
+        if warm_up:
+            await self.warm_up()
+
+    async def warm_up(self):
+        # Open connections (TLS + auth) before the first user request needs them.
+        # Failures are logged only: a cold client still works, it is just slower once.
+        import grpc
+
+        timeout = _env_float("WARMUP_TIMEOUT", 5.0)
+
+        async def warm(name, coro):
+            try:
+                await asyncio.wait_for(coro, timeout)
+            except Exception as e:
+                logger.warning("Warm-up of %s client failed: %s", name, e)
+
+        tasks = [
+            warm("openai", self.openai.models.list()),
+            warm("tts", self.tts.transport.grpc_channel.channel_ready()),
+            warm("speech", asyncio.to_thread(
+                lambda: grpc.channel_ready_future(self.speech.transport.grpc_channel).result(timeout)
+            )),
+        ]
+        if self._groq is not None:
+            tasks.append(warm("groq", self._groq.models.list()))
+        await asyncio.gather(*tasks)
+
+    async def close(self):
+        if self._openai is not None:
+            await self._openai.close()
+        if self._groq is not None:
+            await self._groq.close()
+        if self._tts is not None:
+            await self._tts.transport.close()
+        if self._speech_async is not None:
+            await self._speech_async.transport.close()
+        if self._speech is not None:
+            self._speech.transport.close()
+        if self._tts_sync is not None:
+            self._tts_sync.transport.close()
+        self._openai = self._groq = None
+        self._speech = self._speech_async = self._tts = self._tts_sync = None
+
+
+registry = ClientRegistry()
+
+
+@asynccontextmanager
+async def lifespan(app=None):
+    # Lifespan hook shared by every app: create and warm the clients, close them on shutdown
+    await registry.startup()
+    try:
+        yield
+    finally:
+        await registry.close()
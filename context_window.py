@@ -0,0 +1,90 @@
+import os
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to a character-based estimate
+    tiktoken = None
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+CONTEXT_KEEP_RECENT = int(os.getenv("CONTEXT_KEEP_RECENT", "6"))  # messages always sent verbatim
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+
+# Per-message framing overhead of the chat format
+_MESSAGE_OVERHEAD = 4
+
+SUMMARY_HEADER = "Summary of the earlier part of this interview:\n"
+
+Summarizer = Callable[[str, List[Dict]], Awaitable[str]]
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def message_tokens(message: Dict) -> int:
+    return count_tokens(message["content"]) + _MESSAGE_OVERHEAD
+
+
+class ContextWindow:
+    """Keeps the prompt sent to the LLM within a token budget.
+
+    The system prompt and the most recent messages are always sent as-is. When the whole
+    conversation no longer fits, the oldest turns are folded into a running summary that is
+    updated incrementally, so each turn summarizes only what has just fallen out of the window.
+    """
+
+    def __init__(self, summarize: Summarizer, budget: int = CONTEXT_TOKEN_BUDGET,
+                 keep_recent: int = CONTEXT_KEEP_RECENT):
+        self.summarize = summarize
+        self.budget = budget
+        self.keep_recent = max(keep_recent, 1)
+
+    async def build(self, conversation: List[Dict], summary: str = "",
+                    summarized_upto: int = 1) -> Tuple[List[Dict], str, int]:
+        """Return ``(messages, summary, summarized_upto)`` for the next completion.
+
+        ``summarized_upto`` is the index of the first message not covered by ``summary``.
+        """
+        sizes = [message_tokens(m) for m in conversation]
+        if sum(sizes) <= self.budget:
+            return conversation, summary, summarized_upto
+
+        # Slide the cut forward until the verbatim tail plus a summary fits the budget
+        fixed = sizes[0] + SUMMARY_MAX_TOKENS + _MESSAGE_OVERHEAD
+        last_cut = len(conversation) - self.keep_recent
+        # The latest the tail may start is a founder message too, or a full budget loop below
+        # would leave it starting on the VC's reply
+        while last_cut > 1 and conversation[last_cut]["role"] != "user":
+            last_cut -= 1
+        cut = max(summarized_upto, 1)
+        while cut < last_cut and fixed + sum(sizes[cut:]) > self.budget:
+            cut += 1
+        # Start the verbatim tail on a founder message so question/answer pairs stay together
+        while 1 < cut < last_cut and conversation[cut]["role"] != "user":
+            cut += 1
+
+        if cut > summarized_upto:
+            summary = await self.summarize(summary, conversation[summarized_upto:cut])
+            summarized_upto = cut
+
+        messages = [conversation[0]]
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_HEADER + summary})
+        messages.extend(conversation[summarized_upto:])
+        return messages, summary, summarized_upto
@@ -0,0 +1,120 @@
+"""Read-only queries over the structured evaluations in evaluation_store, for dashboards.
+
+    GET /evaluations?vc_name=Shark&since=2026-10-12T00:00:00&limit=50
+    GET /evaluations?verdict=Invest&cursor=<next_cursor of the previous page>
+    GET /evaluations/stats?group_by=vc_name&since=2026-10-12T00:00:00
+    GET /evaluations/session/{session_id}
+    GET /evaluations?prompt_version=<version>     every session's evaluation under one prompt version
+
+All routes need a signed-in user. Users listed in EVALUATION_ADMINS see every evaluation;
+everyone else only sees evaluations of their own sessions.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+import evaluation_store
+from auth_api import User, get_current_user
+
+router = APIRouter()
+
+# Comma-separated usernames allowed to query everyone's evaluations
+EVALUATION_ADMINS = {name.strip() for name in os.getenv("EVALUATION_ADMINS", "").split(",") if name.strip()}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(evaluation_store.create_evaluation_tables)
+    try:
+        yield
+    finally:
+        evaluation_store.db_pool.close()
+
+
+def is_admin(user: User) -> bool:
+    return user.username in EVALUATION_ADMINS
+
+
+def _scoped_username(user: User, username: Optional[str]) -> Optional[str]:
+    # Admins may filter by any user (or none); everyone else is pinned to themselves
+    if is_admin(user):
+        return username
+    if username is not None and username != user.username:
+        raise HTTPException(status_code=403, detail="Not allowed to read other users' evaluations")
+    return user.username
+
+
+def _filters(user, vc_name, verdict, username, since, until, min_score, prompt_version) -> dict:
+    if verdict is not None and verdict not in evaluation_store.VERDICTS:
+        raise HTTPException(status_code=400, detail=f"verdict must be one of {', '.join(evaluation_store.VERDICTS)}")
+    return {
+        "vc_name": vc_name,
+        "verdict": verdict,
+        "username": _scoped_username(user, username),
+        "since": since.timestamp() if since else None,
+        "until": until.timestamp() if until else None,
+        "min_score": min_score,
+        "prompt_version": prompt_version,
+    }
+
+
+def _parse_cursor(cursor: str):
+    created_at, _, row_id = cursor.partition(":")
+    try:
+        return float(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/evaluations")
+async def list_evaluations(
+    vc_name: Optional[str] = None,
+    verdict: Optional[str] = None,
+    username: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    prompt_version: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+):
+    filters = _filters(user, vc_name, verdict, username, since, until, min_score, prompt_version)
+    items, next_cursor = await asyncio.to_thread(
+        evaluation_store.list_evaluations, limit, _parse_cursor(cursor) if cursor else None, **filters)
+    return {
+        "items": items,
+        "next_cursor": f"{next_cursor[0]!r}:{next_cursor[1]}" if next_cursor else None,
+    }
+
+
+@router.get("/evaluations/stats")
+async def evaluation_stats(
+    group_by: str = "vc_name",
+    vc_name: Optional[str] = None,
+    verdict: Optional[str] = None,
+    username: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = None,
+    prompt_version: Optional[str] = None,
+    user: User = Depends(get_current_user),
+):
+    if group_by not in evaluation_store.STATS_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(evaluation_store.STATS_GROUPS)}")
+    filters = _filters(user, vc_name, verdict, username, since, until, min_score, prompt_version)
+    return {"group_by": group_by, "groups": await asyncio.to_thread(evaluation_store.evaluation_stats, group_by, **filters)}
+
+
+@router.get("/evaluations/session/{session_id}")
+async def session_evaluations(session_id: str, user: User = Depends(get_current_user)):
+    # Someone else's session answers 404 as well, so session ids cannot be probed
+    evaluations = await asyncio.to_thread(
+        evaluation_store.session_evaluations, session_id, None if is_admin(user) else user.username)
+    if not evaluations:
+        raise HTTPException(status_code=404, detail="No evaluation for this session")
+    return {"session_id": session_id, "evaluations": evaluations}
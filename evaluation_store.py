@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlite_pool import SQLitePool
+
+# --- SQLite Setup ---
+EVALUATION_DB_PATH = os.getenv("EVALUATION_DB_PATH", "evaluations.db")
+db_pool = SQLitePool(EVALUATION_DB_PATH, size=int(os.getenv("EVALUATION_DB_POOL_SIZE", "4")))
+
+# Structured fields parsed from the evaluation text; added to databases created before they existed
+_PARSED_COLUMNS = {
+    "score": "REAL",
+    "verdict": "TEXT",
+    "strengths": "TEXT",       # JSON list
+    "improvements": "TEXT",    # JSON list
+    "vc_name": "TEXT",
+    "username": "TEXT",
+}
+
+def create_evaluation_tables():
+    with db_pool.transaction() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            model TEXT NOT NULL,
+            source TEXT NOT NULL,
+            evaluation TEXT NOT NULL,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            created_at REAL NOT NULL,
+            UNIQUE (session_id, prompt_version)
+        )
+        """)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(evaluations)")}
+        missing = [name for name in _PARSED_COLUMNS if name not in existing]
+        for name in missing:
+            conn.execute(f"ALTER TABLE evaluations ADD COLUMN {name} {_PARSED_COLUMNS[name]}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_created_at ON evaluations(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_version ON evaluations(prompt_version)")
+        # Dashboard filters: each is followed by created_at for "this week" ranges and paging
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_vc_name ON evaluations(vc_name, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_verdict ON evaluations(verdict, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_username ON evaluations(username, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_session ON evaluations(session_id, created_at)")
+        if missing:
+            _backfill(conn)
+
+# --- Parsing ---
+VERDICTS = ("Invest", "Needs Work", "Pass")
+
+# Most specific first: "Score: 7/10", then "Score out of 10: 7", then any "7/10" in the text
+_SCORES = [
+    re.compile(r"score\b[^\n]*?(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10\b", re.IGNORECASE),
+    re.compile(r"score(?:\s+out\s+of\s+10)?\W*(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10\b", re.IGNORECASE),
+]
+_VERDICT = re.compile(r"verdict\W*(invest|needs\s+work|pass)\b", re.IGNORECASE)
+_MARKERS = re.compile(r"^[\s#>*\-•\d.)]+")
+_STRENGTHS = re.compile(r"^(key\s+)?strengths?\b", re.IGNORECASE)
+_IMPROVEMENTS = re.compile(r"^((key\s+)?areas?\s+(for|of|to)\s+improve(ment)?|improvements?|weaknesses)\b", re.IGNORECASE)
+_OTHER_HEADINGS = re.compile(r"^((final\s+)?verdict|(overall\s+)?score|summary|overall)\b", re.IGNORECASE)
+
+@dataclass
+class ParsedEvaluation:
+    score: Optional[float] = None
+    verdict: Optional[str] = None
+    strengths: List[str] = field(default_factory=list)
+    improvements: List[str] = field(default_factory=list)
+
+def _clean(line: str) -> str:
+    return _MARKERS.sub("", line).replace("**", "").replace("__", "").strip()
+
+def parse_evaluation(text: str) -> ParsedEvaluation:
+    """Pull the score, verdict, strengths and areas for improvement out of an evaluation.
+
+    Follows the layout ``evaluation_prompt`` asks for (score out of 10, strengths, areas for
+    improvement, final verdict) but tolerates markdown headings, bold labels and numbering.
+    Fields that cannot be found are left empty.
+    """
+    parsed = ParsedEvaluation()
+    for pattern in _SCORES:
+        score = pattern.search(text)
+        if score:
+            parsed.score = min(10.0, float(score.group(1)))
+            break
+    verdict = _VERDICT.search(text)
+    if verdict:
+        found = " ".join(verdict.group(1).split()).lower()
+        parsed.verdict = next(v for v in VERDICTS if v.lower() == found)
+
+    section: Optional[List[str]] = None
+    for line in text.splitlines():
+        cleaned = _clean(line)
+        if not cleaned:
+            continue
+        heading = None
+        if _STRENGTHS.match(cleaned):
+            heading = parsed.strengths
+        elif _IMPROVEMENTS.match(cleaned):
+            heading = parsed.improvements
+        elif _OTHER_HEADINGS.match(cleaned):
+            section = None
+            continue
+        if heading is not None:
+            section = heading
+            # "Strengths: strong team, clear market" carries items on the heading line itself
+            _, _, rest = cleaned.partition(":")
+            if rest.strip():
+                section.append(rest.strip())
+        elif section is not None:
+            section.append(cleaned)
+    return parsed
+
+def _parsed_values(evaluation: str) -> Tuple:
+    parsed = parse_evaluation(evaluation)
+    return parsed.score, parsed.verdict, json.dumps(parsed.strengths), json.dumps(parsed.improvements)
+
+def _backfill(conn):
+    # Rows written before the structured columns existed
+    rows = conn.execute("SELECT id, evaluation FROM evaluations").fetchall()
+    conn.executemany(
+        "UPDATE evaluations SET score = ?, verdict = ?, strengths = ?, improvements = ? WHERE id = ?",
+        [(*_parsed_values(row["evaluation"]), row["id"]) for row in rows],
+    )
+
+# --- Writes ---
+def prompt_version(evaluation_prompt: str, model: str) -> str:
+    # Re-scoring is needed whenever either the prompt text or the model changes
+    return hashlib.sha256(f"{model}\n{evaluation_prompt}".encode("utf-8")).hexdigest()[:16]
+
+def evaluated_sessions(version: str) -> Set[str]:
+    with db_pool.connection() as conn:
+        rows = conn.execute("SELECT session_id FROM evaluations WHERE prompt_version = ?", (version,))
+        return {row["session_id"] for row in rows}
+
+def save_evaluation(session_id: str, version: str, model: str, evaluation: str, source: str,
+                    prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                    vc_name: Optional[str] = None, username: Optional[str] = None):
+    score, verdict, strengths, improvements = _parsed_values(evaluation)
+    with db_pool.transaction() as conn:
+        conn.execute("""
+        INSERT INTO evaluations
+            (session_id, prompt_version, model, source, evaluation, prompt_tokens, completion_tokens, created_at,
+             score, verdict, strengths, improvements, vc_name, username)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(session_id, prompt_version) DO UPDATE SET
+            model = excluded.model, source = excluded.source, evaluation = excluded.evaluation,
+            prompt_tokens = excluded.prompt_tokens, completion_tokens = excluded.completion_tokens,
+            created_at = excluded.created_at, score = excluded.score, verdict = excluded.verdict,
+            strengths = excluded.strengths, improvements = excluded.improvements,
+            vc_name = COALESCE(excluded.vc_name, evaluations.vc_name),
+            username = COALESCE(excluded.username, evaluations.username)
+        """, (session_id, version, model, source, evaluation, prompt_tokens, completion_tokens, time.time(),
+              score, verdict, strengths, improvements, vc_name, username))
+
+# --- Queries ---
+def _row_to_dict(row) -> Dict:
+    result = dict(row)
+    for name in ("strengths", "improvements"):
+        result[name] = json.loads(result[name]) if result[name] else []
+    return result
+
+# A session re-scored under a new prompt version has a row per version; without a version
+# filter only its newest evaluation counts, so sessions are not listed or averaged twice
+_LATEST_PER_SESSION = """NOT EXISTS (
+    SELECT 1 FROM evaluations AS newer WHERE newer.session_id = evaluations.session_id
+    AND (newer.created_at > evaluations.created_at
+         OR (newer.created_at = evaluations.created_at AND newer.id > evaluations.id)))"""
+
+def _filters(vc_name: Optional[str] = None, verdict: Optional[str] = None, username: Optional[str] = None,
+             since: Optional[float] = None, until: Optional[float] = None,
+             min_score: Optional[float] = None, prompt_version: Optional[str] = None) -> Tuple[List[str], List]:
+    clauses, params = [], []
+    for column, value in (("vc_name", vc_name), ("verdict", verdict), ("username", username),
+                          ("prompt_version", prompt_version)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if prompt_version is None:
+        clauses.append(_LATEST_PER_SESSION)
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    if min_score is not None:
+        clauses.append("score >= ?")
+        params.append(min_score)
+    return clauses, params
+
+def list_evaluations(limit: int = 50, cursor: Optional[Tuple[float, int]] = None, **filters) -> Tuple[List[Dict], Optional[Tuple[float, int]]]:
+    """Newest first, ``limit`` per page; one row per session unless ``prompt_version`` is given.
+
+    ``cursor`` is the ``(created_at, id)`` of the last row of the previous page (keyset
+    pagination, so deep pages stay index scans); the returned cursor is None on the last page.
+    """
+    clauses, params = _filters(**filters)
+    if cursor is not None:
+        clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params.extend([cursor[0], cursor[0], cursor[1]])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with db_pool.connection() as conn:
+        rows = conn.execute(
+            f"SELECT * FROM evaluations {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+    items = [_row_to_dict(row) for row in rows[:limit]]
+    next_cursor = (items[-1]["created_at"], items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
+
+def session_evaluations(session_id: str, username: Optional[str] = None) -> List[Dict]:
+    # Every prompt version's evaluation of the session, optionally only if it belongs to ``username``
+    query, params = "SELECT * FROM evaluations WHERE session_id = ?", [session_id]
+    if username is not None:
+        query += " AND username = ?"
+        params.append(username)
+    with db_pool.connection() as conn:
+        rows = conn.execute(query + " ORDER BY created_at DESC", params).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+STATS_GROUPS = ("vc_name", "verdict", "username", "model", "source")
+
+def evaluation_stats(group_by: str = "vc_name", **filters) -> List[Dict]:
+    # Count, score and token totals per group, e.g. average score per VC personality this week;
+    # like list_evaluations, each session counts once unless a prompt_version is given
+    if group_by not in STATS_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(STATS_GROUPS)}")
+    clauses, params = _filters(**filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    with db_pool.connection() as conn:
+        rows = conn.execute(f"""
+        SELECT {group_by} AS "group", COUNT(*) AS count, AVG(score) AS avg_score,
+               MIN(score) AS min_score, MAX(score) AS max_score,
+               SUM(verdict = 'Invest') AS invest, SUM(verdict = 'Needs Work') AS needs_work,
+               SUM(verdict = 'Pass') AS pass,
+               SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens
+        FROM evaluations {where}
+        GROUP BY {group_by} ORDER BY count DESC
+        """, params).fetchall()
+    return [dict(row) for row in rows]
@@ -1,23 +1,84 @@
-from google.cloud import speech
-from pydub import AudioSegment
-import io
-import tempfile
+from clients import registry as clients
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Union
+from metrics import AUDIO_SECONDS, observe_stage, timed
+import vad
+import asyncio
+import contextvars
+import functools
+import os
+import subprocess
+import threading
+import time
 
-def convert_to_wav_linear16(input_path: str) -> str:
-    audio = AudioSegment.from_file(input_path)
-    audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-    temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    audio.export(temp_wav.name, format="wav")
-    return temp_wav.name
+# Recognition is a long blocking gRPC stream (roughly as long as the audio), so it
+# gets its own pool instead of competing with FastAPI's default threadpool.
+_stt_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STT_MAX_WORKERS", "32")),
+    thread_name_prefix="stt",
+)
 
-def transcribe_streaming_google(audio_path: str, language_code: str = "en-US") -> str:
-    audio_path = convert_to_wav_linear16(audio_path)
+# Trim silence and recognize long recordings as concurrent segments (vad.py); 0 streams the
+# whole recording through one recognition call as it is decoded
+STT_VAD = os.getenv("STT_VAD", "1") == "1"
+# Segments of one upload recognized at the same time (they share the STT executor)
+STT_SEGMENT_CONCURRENCY = int(os.getenv("STT_SEGMENT_CONCURRENCY", "8"))
 
-    client = speech.SpeechClient()
+SAMPLE_RATE = 16000
+# 100 ms of 16 kHz mono LINEAR16 audio, the frame size recommended for streaming recognition
+CHUNK_BYTES = SAMPLE_RATE * 2 // 10
+
+def decode_to_linear16(audio: bytes, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Decode an encoded upload (MP3, ...) to 16 kHz mono LINEAR16 PCM entirely in memory.
+
+    ffmpeg (the same binary pydub is configured with) reads from stdin and writes raw PCM to
+    stdout, and chunks are yielded as soon as they are produced, so recognition can start
+    before decoding has finished. No intermediate files are written.
+    """
+    from pydub import AudioSegment  # imported on first use; only needed for its ffmpeg lookup
+
+    proc = subprocess.Popen(
+        [AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+         "-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le",
+         "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    def feed():
+        try:
+            proc.stdin.write(audio)
+        except BrokenPipeError:
+            pass
+        finally:
+            proc.stdin.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while chunk := proc.stdout.read(chunk_size):
+            yield chunk
+        proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"Audio decoding failed: {proc.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        feeder.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+def _recognize(chunks: Iterable[bytes], language_code: str) -> str:
+    # One streaming_recognize call over LINEAR16 chunks; returns the final transcript
+    from google.cloud import speech
+
+    client = clients.speech
 
     config = speech.RecognitionConfig(
         encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=16000,
+        sample_rate_hertz=SAMPLE_RATE,
         language_code=language_code,
     )
 
@@ -27,14 +88,9 @@ def transcribe_streaming_google(audio_path: str, language_code: str = "en-US") -
         single_utterance=False,
     )
 
-    def generate_requests():
-        with io.open(audio_path, "rb") as audio_file:
-            while chunk := audio_file.read(4096):
-                yield speech.StreamingRecognizeRequest(audio_content=chunk)
-
     responses = client.streaming_recognize(
         config=streaming_config,
-        requests=generate_requests()
+        requests=(speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks)
     )
 
     transcript = ""
@@ -42,5 +98,72 @@ def transcribe_streaming_google(audio_path: str, language_code: str = "en-US") -
         for result in response.results:
             if result.is_final:
                 transcript += result.alternatives[0].transcript + " "
-
     return transcript.strip()
+
+def transcribe_streaming_google(audio: Union[bytes, str], language_code: str = "en-US") -> str:
+    # Accepts the raw upload bytes; a file path is still accepted for scripts and old callers
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+
+    # Decoding is pipelined with recognition and runs on gRPC's request thread; keep its
+    # timings here and record them once the stream is done
+    decoded = {"bytes": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    def decoded_chunks():
+        for chunk in decode_to_linear16(audio):
+            decoded["bytes"] += len(chunk)
+            yield chunk
+        decoded["seconds"] = time.perf_counter() - start
+
+    transcript = _recognize(decoded_chunks(), language_code)
+
+    observe_stage("stt_decode", decoded["seconds"])
+    observe_stage("stt_recognize", time.perf_counter() - start)
+    AUDIO_SECONDS.observe(decoded["bytes"] / (SAMPLE_RATE * 2), direction="in")
+    return transcript
+
+def transcribe_pcm(pcm: bytes, language_code: str = "en-US") -> str:
+    # Recognize already-decoded LINEAR16 audio, e.g. one VAD segment
+    with timed("stt_recognize"):
+        return _recognize((pcm[i:i + CHUNK_BYTES] for i in range(0, len(pcm), CHUNK_BYTES)), language_code)
+
+def decode_and_segment(audio: bytes) -> List[bytes]:
+    """Decode the upload and cut it into speech segments (see vad.split_segments).
+
+    Falls back to the whole recording when no speech is detected, so a quiet but valid
+    recording is still sent to recognition.
+    """
+    with timed("stt_decode"):
+        pcm = b"".join(decode_to_linear16(audio))
+    with timed("stt_vad"):
+        segments = [segment.audio for segment in vad.split_segments(pcm, SAMPLE_RATE)]
+    AUDIO_SECONDS.observe(len(pcm) / (SAMPLE_RATE * 2), direction="decoded")
+    return segments or [pcm]
+
+def _in_context(fn, *args):
+    # Each executor call gets its own copy of the request context (a Context can only be
+    # entered by one thread at a time), so the stages land in the request's Server-Timing
+    return functools.partial(contextvars.copy_context().run, fn, *args)
+
+async def transcribe_streaming_google_async(audio: Union[bytes, str], language_code: str = "en-US") -> str:
+    loop = asyncio.get_running_loop()
+    if not STT_VAD:
+        return await loop.run_in_executor(_stt_executor, _in_context(transcribe_streaming_google, audio, language_code))
+
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    # Silence is trimmed before it is billed, and segments of a long pitch are recognized in
+    # parallel; the transcripts are joined in their original order
+    segments = await loop.run_in_executor(_stt_executor, _in_context(decode_and_segment, audio))
+    AUDIO_SECONDS.observe(sum(len(s) for s in segments) / (SAMPLE_RATE * 2), direction="in")
+    semaphore = asyncio.Semaphore(STT_SEGMENT_CONCURRENCY)
+
+    async def recognize(segment: bytes) -> str:
+        async with semaphore:
+            return await loop.run_in_executor(_stt_executor, _in_context(transcribe_pcm, segment, language_code))
+
+    transcripts = await asyncio.gather(*(recognize(segment) for segment in segments))
+    return " ".join(t for t in transcripts if t)
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from clients import registry as clients
+from metrics import LLM_BACKEND_SECONDS, LLM_FAILOVERS, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated provider:model pairs in priority order, e.g. "openai:gpt-4o-mini,groq:llama3-70b-8192"
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", f"openai:{os.getenv('VC_MODEL', 'gpt-4o-mini')}")
+# "priority" keeps the configured order; "latency" prefers the backend with the lowest rolling median
+LLM_ROUTING = os.getenv("LLM_ROUTING", "priority")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))                          # whole non-streamed reply
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "20"))  # first streamed chunk
+# Hedging: when a call is slower than this percentile of its backend's recent latency, the same
+# request is also sent to the next backend and whichever answers first wins
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))     # samples kept per backend
+LLM_ERROR_WINDOW = float(os.getenv("LLM_ERROR_WINDOW", "60"))        # seconds of outcomes kept
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))   # above this a backend is tried last
+
+# Only these providers accept stream_options (usage on the final chunk)
+_STREAM_USAGE_PROVIDERS = {"openai"}
+# Client errors are the caller's fault and would fail on every backend
+_RETRYABLE_CLIENT_STATUS = {408, 409, 429}
+
+CREATE = "create"
+FIRST_TOKEN = "first_token"
+
+
+class Backend:
+    """One provider/model pair with its rolling latency and error statistics."""
+
+    def __init__(self, provider: str, model: str, window: int = LLM_LATENCY_WINDOW):
+        self.provider = provider
+        self.model = model
+        self.latencies: Dict[str, Deque[float]] = {CREATE: deque(maxlen=window), FIRST_TOKEN: deque(maxlen=window)}
+        self.outcomes: Deque[Tuple[float, bool]] = deque()
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def client(self):
+        if self.provider == "openai":
+            return clients.openai
+        if self.provider == "groq":
+            return clients.groq
+        raise ValueError(f"Unknown LLM provider: {self.provider}")
+
+    def record(self, kind: str, seconds: float, ok: bool):
+        if ok:
+            self.latencies[kind].append(seconds)
+        self.outcomes.append((time.monotonic(), ok))
+        LLM_BACKEND_SECONDS.observe(seconds, backend=self.name, kind=kind, outcome="ok" if ok else "error")
+
+    def record_failure(self):
+        # A stream that broke after its first chunk: counts against the error rate only
+        self.outcomes.append((time.monotonic(), False))
+
+    def percentile(self, kind: str, pct: float) -> Optional[float]:
+        samples = self.latencies[kind]
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def error_rate(self) -> float:
+        cutoff = time.monotonic() - LLM_ERROR_WINDOW
+        while self.outcomes and self.outcomes[0][0] < cutoff:
+            self.outcomes.popleft()
+        if len(self.outcomes) < 5:
+            return 0.0
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def hedge_delay(self, kind: str) -> Optional[float]:
+        if len(self.latencies[kind]) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.percentile(kind, LLM_HEDGE_PERCENTILE)
+
+
+def parse_backends(spec: str) -> List[Backend]:
+    backends = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            provider, _, model = item.partition(":")
+            backends.append(Backend(provider.strip().lower(), model.strip()))
+    return backends
+
+
+def _is_retryable(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500 or status in _RETRYABLE_CLIENT_STATUS
+
+
+class LLMRouter:
+    """Sends chat completions to the configured backends with failover and optional hedging.
+
+    Backends are tried in priority order (or by rolling median latency with
+    ``LLM_ROUTING=latency``); ones with a recent error rate above ``LLM_MAX_ERROR_RATE`` move to
+    the end. A failed or timed-out attempt fails over to the next backend. With ``LLM_HEDGE=1``
+    an attempt slower than its backend's p95 also starts the next backend once, and the first
+    answer wins. Streams are only hedged or failed over until their first chunk arrives.
+    """
+
+    def __init__(self, backends: List[Backend], routing: str = LLM_ROUTING, hedge: bool = LLM_HEDGE,
+                 timeout: float = LLM_TIMEOUT, first_token_timeout: float = LLM_FIRST_TOKEN_TIMEOUT):
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+        self.routing = routing
+        self.hedge = hedge
+        self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
+
+    @classmethod
+    def from_env(cls, env: str = "LLM_BACKENDS", default: str = LLM_BACKENDS) -> "LLMRouter":
+        return cls(parse_backends(os.getenv(env, default)))
+
+    def ordered(self, kind: str = CREATE) -> List[Backend]:
+        backends = list(self.backends)
+        if self.routing == "latency":
+            # Backends without samples yet sort first so they get measured
+            backends.sort(key=lambda b: b.percentile(kind, 50) or 0.0)
+        return sorted(backends, key=lambda b: b.error_rate() > LLM_MAX_ERROR_RATE)
+
+    def configured_model(self, served: Optional[str] = None) -> str:
+        """The configured model name behind ``served``, the model a response reports.
+
+        Providers report dated snapshots ("gpt-4o-mini-2024-07-18" for "gpt-4o-mini"), so the
+        configured name is what stays stable across calls. Falls back to the first backend.
+        """
+        if served:
+            matches = [b.model for b in self.backends if served == b.model or served.startswith(b.model + "-")]
+            if matches:
+                return max(matches, key=len)
+        return self.backends[0].model
+
+    async def _race(self, kind: str, attempt: Callable[[Backend], Awaitable],
+                    discard: Optional[Callable[[object], Awaitable]] = None):
+        queue = self.ordered(kind)
+        tasks: Dict[asyncio.Task, Backend] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            backend = queue.pop(0)
+            tasks[asyncio.ensure_future(attempt(backend))] = backend
+
+        launch()
+        try:
+            while tasks:
+                delay = None
+                if self.hedge and not hedged and queue and len(tasks) == 1:
+                    delay = next(iter(tasks.values())).hedge_delay(kind)
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    LLM_HEDGES.inc(backend=queue[0].name)
+                    launch()
+                    continue
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    if not _is_retryable(last_error):
+                        raise last_error
+                    logger.warning("LLM backend %s failed: %r", backend.name, last_error)
+                if not tasks and queue:
+                    LLM_FAILOVERS.inc(backend=queue[0].name)
+                    launch()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Losers that finished in the same tick as the winner still hold an open response
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if discard is not None and not isinstance(result, BaseException):
+                    await discard(result)
+
+    async def create(self, messages: List[Dict], **kwargs):
+        """Non-streamed chat completion; the response of whichever backend answered."""
+        async def attempt(backend: Backend):
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    backend.client.chat.completions.create(model=backend.model, messages=messages, **kwargs),
+                    self.timeout,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                backend.record(CREATE, time.perf_counter() - start, ok=False)
+                raise
+            backend.record(CREATE, time.perf_counter() - start, ok=True)
+            return response
+
+        return await self._race(CREATE, attempt)
+
+    async def stream(self, messages: List[Dict], **kwargs) -> AsyncIterator:
+        """Streamed chat completion, yielding the provider's chunks."""
+        async def attempt(backend: Backend):
+            options = dict(kwargs)
+            if backend.provider not in _STREAM_USAGE_PROVIDERS:
+                options.pop("stream_options", None)
+            start = time.perf_counter()
+            response = None
+            try:
+                async def first_chunk():
+                    nonlocal response
+                    response = await backend.client.chat.completions.create(
+                        model=backend.model, messages=messages, stream=True, **options)
+                    chunks = response.__aiter__()
+                    try:
+                        return chunks, await chunks.__anext__()
+                    except StopAsyncIteration:
+                        return chunks, None
+                chunks, first = await asyncio.wait_for(first_chunk(), self.first_token_timeout)
+            except BaseException as e:
+                if response is not None:
+                    await response.close()
+                if not isinstance(e, asyncio.CancelledError):
+                    backend.record(FIRST_TOKEN, time.perf_counter() - start, ok=False)
+                raise
+            backend.record(FIRST_TOKEN, time.perf_counter() - start, ok=True)
+            return backend, response, chunks, first
+
+        async def discard(result):
+            await result[1].close()
+
+        backend, response, chunks, first = await self._race(FIRST_TOKEN, attempt, discard)
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        except Exception:
+            backend.record_failure()
+            raise
+        finally:
+            await response.close()
+
+
+router = LLMRouter.from_env()
@@ -1,58 +1,160 @@
 import os
-import shutil
 import uuid
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse
-from google_new import transcribe_streaming_google
-from bot_api import vc_qna, reset_session, UserInput
-from tts_google import tts_google
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+from fastapi import APIRouter, Depends, FastAPI, UploadFile, File, HTTPException, Form
+from fastapi.responses import Response, StreamingResponse
+from google_new import transcribe_streaming_google_async
+import bot_api
+from bot_api import vc_qna, reset_session, stream_vc_turn, UserInput
+import auth_api
+from auth_api import User, get_optional_user
+from tts_google import synthesize_mp3_async, cache_key, purge_tts_output, get_tts_cache, close_tts_cache
+from utils import iter_sentences, compose_lifespans
+from clients import lifespan as clients_lifespan
+from metrics import instrument, timed
 
-app = FastAPI()
+router = APIRouter()
 
+# Sentences synthesized ahead of the one currently being streamed back
+TTS_PIPELINE_DEPTH = int(os.getenv("TTS_PIPELINE_DEPTH", "4"))
 
-@app.post("/vc/audio-pitch")
+
+async def transcribe_upload(audio_file: UploadFile) -> str:
+    # Step 1: Read uploaded MP3 into memory (decoded and streamed to STT without temp files)
+    if not audio_file.filename.endswith(".mp3"):
+        raise HTTPException(status_code=400, detail="Only .mp3 files are supported.")
+    audio = await audio_file.read()
+
+    # Step 2: Transcribe using Google STT (runs on the STT executor, off the event loop)
+    with timed("stt"):
+        transcript = await transcribe_streaming_google_async(audio)
+    if not transcript:
+        raise HTTPException(status_code=400, detail="Speech transcription failed.")
+    return transcript
+
+
+@router.post("/vc/audio-pitch")
 async def process_pitch(
     audio_file: UploadFile = File(...),
     session_id: str = Form(...),
-    vc_name: str = Form("Default")  # Added VC personality input
+    vc_name: str = Form("Default"),  # Added VC personality input
+    user: Optional[User] = Depends(get_optional_user),
 ):
     try:
-        # Step 1: Save uploaded MP3
-        if not audio_file.filename.endswith(".mp3"):
-            raise HTTPException(status_code=400, detail="Only .mp3 files are supported.")
-        
-        input_path = f"temp_inputs/{audio_file.filename}"
-        os.makedirs("temp_inputs", exist_ok=True)
-        with open(input_path, "wb") as f:
-            shutil.copyfileobj(audio_file.file, f)
-
-        # Step 2: Transcribe using Google STT
-        transcript = transcribe_streaming_google(input_path)
-        if not transcript:
-            raise HTTPException(status_code=400, detail="Speech transcription failed.")
+        transcript = await transcribe_upload(audio_file)
 
         # Step 3: Query VC Bot with session_id and vc_name
         user_input = UserInput(message=transcript, session_id=session_id, vc_name=vc_name)
-        response = vc_qna(user_input)
+        response = await vc_qna(user_input, user)
 
         reply_text = response.get("message")
         if not reply_text:
             raise HTTPException(status_code=500, detail="VC Bot did not respond properly.")
 
-        # Step 4: Convert bot reply to MP3
-        tts_output_path = tts_google(reply_text, language_code="en-US")
+        # Step 4: Convert bot reply to MP3 (served from the TTS cache for repeated text)
+        audio = await synthesize_mp3_async(reply_text, language_code="en-US")
 
-        # Step 5: Return MP3 response
-        return FileResponse(path=tts_output_path, media_type="audio/mpeg", filename=os.path.basename(tts_output_path))
+        # Step 5: Return MP3 response, named after its cache key; nothing is left on disk
+        filename = f"google_tts_{cache_key(reply_text, 'en-US')[:32]}.mp3"
+        return Response(
+            content=audio,
+            media_type="audio/mpeg",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/vc/reset-audio-session")
+async def reply_tokens(events):
+    # Text to speak for one turn (stream_vc_turn events): the streamed reply, or the final
+    # message when nothing was streamed
+    streamed = False
+    try:
+        async for event in events:
+            if "token" in event:
+                streamed = True
+                yield event["token"]
+            elif not streamed and event.get("message"):
+                yield event["message"]
+    finally:
+        # Releases the session turn right away when the reply is abandoned
+        await events.aclose()
+
+
+async def pipelined_speech(tokens, language_code: str = "en-US"):
+    """Synthesize each sentence as soon as the LLM finishes it and yield the MP3 chunks in order."""
+    pending: asyncio.Queue = asyncio.Queue(maxsize=TTS_PIPELINE_DEPTH)
+
+    async def produce():
+        try:
+            async for sentence in iter_sentences(tokens):
+                await pending.put(asyncio.create_task(synthesize_mp3_async(sentence, language_code)))
+        except asyncio.CancelledError:
+            # Cancelled by the consumer, which no longer reads the queue (it may be full)
+            raise
+        except Exception:
+            await pending.put(None)
+            raise
+        await pending.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (task := await pending.get()) is not None:
+            yield await task
+        await producer
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+        # On disconnect or error the token stream (and the session turn it holds) is closed
+        # now instead of whenever the generator happens to be garbage collected
+        await tokens.aclose()
+
+
+@router.post("/vc/audio-pitch/stream")
+async def process_pitch_stream(
+    audio_file: UploadFile = File(...),
+    session_id: str = Form(...),
+    vc_name: str = Form("Default"),
+    user: Optional[User] = Depends(get_optional_user),
+):
+    # Transcription errors are still reported as regular HTTP errors before streaming starts
+    transcript = await transcribe_upload(audio_file)
+    user_input = UserInput(message=transcript, session_id=session_id, vc_name=vc_name)
+    events = await bot_api.started(stream_vc_turn(user_input, user.username if user else None))
+    return StreamingResponse(pipelined_speech(reply_tokens(events)), media_type="audio/mpeg")
+
+
+@router.post("/vc/reset-audio-session")
 async def reset_audio_session(
     session_id: str = Form(...),
     vc_name: str = Form("Default")  # Added VC personality input for reset
 ):
     user_input = UserInput(message="", session_id=session_id, vc_name=vc_name)
-    return reset_session(user_input)
+    return await reset_session(user_input)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(get_tts_cache)
+    await asyncio.to_thread(purge_tts_output)
+    try:
+        yield
+    finally:
+        close_tts_cache()
+
+
+# Standalone app, kept for `uvicorn main_controller:app --env-file .env` (only app.py loads .env itself);
+# the composed application is app.py
+app = FastAPI(lifespan=compose_lifespans(clients_lifespan, auth_api.lifespan, bot_api.lifespan, lifespan))
+app.include_router(router)
+instrument(app)
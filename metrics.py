@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+# Add a Server-Timing header with the stages recorded while handling each request
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+AUDIO_SECONDS_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_INF_LABEL = 'le="+Inf"'
+
+# Stages recorded during the current request, as (name, seconds); None outside a request
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, safe to observe from executor threads."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels → [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(b), s, c) for key, (b, s, c) in self._series.items()}
+        for key, (bucket_counts, total, count) in sorted(series.items()):
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Per-process metrics rendered in the Prometheus text exposition format.
+
+    With several uvicorn workers each process keeps its own series; scrape every worker
+    (or run one worker per port) to get complete numbers.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = SECONDS_BUCKETS,
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, help, buckets, labelnames)
+        return self._metrics[name]
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, help, labelnames)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", labelnames=("method", "route", "status"))
+STAGE_SECONDS = registry.histogram(
+    "vc_stage_duration_seconds", "Latency of one hot-path stage (stt, llm, tts, session I/O, ...).",
+    labelnames=("stage",))
+LLM_TOKENS = registry.histogram(
+    "vc_llm_tokens", "Tokens per LLM call.", TOKEN_BUCKETS, labelnames=("call", "kind"))
+AUDIO_SECONDS = registry.histogram(
+    "vc_audio_seconds", "Seconds of audio decoded from uploads, sent to recognition (in) or synthesized (out).",
+    AUDIO_SECONDS_BUCKETS,
+    labelnames=("direction",))
+SESSION_BYTES = registry.histogram(
+    "vc_session_bytes", "Size of a session's conversation when it is written.", BYTES_BUCKETS)
+TTS_CACHE = registry.counter("vc_tts_cache_total", "TTS cache lookups.", labelnames=("result",))
+LLM_BACKEND_SECONDS = registry.histogram(
+    "vc_llm_backend_seconds", "Latency of one attempt on one LLM backend (whole reply or first token).",
+    labelnames=("backend", "kind", "outcome"))
+LLM_FAILOVERS = registry.counter("vc_llm_failovers_total", "Requests retried on the next backend.",
+                                 labelnames=("backend",))
+LLM_HEDGES = registry.counter("vc_llm_hedges_total", "Hedged second requests started.", labelnames=("backend",))
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def record_usage(call: str, usage):
+    # ``usage`` as returned by the OpenAI/Groq SDKs; absent on some streamed responses
+    if usage is None:
+        return
+    LLM_TOKENS.observe(usage.prompt_tokens or 0, call=call, kind="prompt")
+    LLM_TOKENS.observe(usage.completion_tokens or 0, call=call, kind="completion")
+
+
+def server_timing(timings: List[Tuple[str, float]]) -> str:
+    totals: Dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+def instrument(app: FastAPI):
+    """Time every request on ``app`` and serve the registry at ``GET /metrics``.
+
+    For streaming responses the Server-Timing header only covers the stages that finished
+    before the first byte was sent; the histograms still see everything.
+    """
+    @app.middleware("http")
+    async def record_request(request: Request, call_next):
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            if METRICS_TIMING_HEADER and timings:
+                response.headers["Server-Timing"] = server_timing(timings)
+            return response
+        finally:
+            _request_timings.reset(token)
+            route = request.scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                    route=getattr(route, "path", "unmatched"), status=status)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,21 +1,85 @@
 import os
-from fastapi import FastAPI, Form
+import re
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Form, Request, HTTPException, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from dotenv import load_dotenv
-from groq import Groq
-from openai import OpenAI
+from typing import List, Optional, Tuple
+from clients import lifespan as clients_lifespan
+from llm_router import router as llm
+from retrieval import BM25Index
+from pitch_jobs import PitchJob, PitchJobQueue, JobLimitExceeded, QueueFull, DONE, FAILED
+from prompt_registry import registry as prompt_registry
+import auth_api
+from auth_api import User, get_optional_user
+from metrics import instrument, observe_stage, record_usage
+from utils import compose_lifespans
 
-load_dotenv(override=True)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+router = APIRouter()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(sample_pitch_index)
+    await pitch_jobs.start()
+    try:
+        yield
+    finally:
+        await pitch_jobs.close()
 
-# Load the pitch samples once at startup
-with open("sample_pitches.txt", "r", encoding="utf-8") as f:
-    sample = f.read().strip()
+# Few-shot examples: "retrieve" injects only the PITCH_FEWSHOT_K most relevant sample pitches,
+# "full" falls back to the whole sample file
+PITCH_FEWSHOT_MODE = os.getenv("PITCH_FEWSHOT_MODE", "retrieve")
+PITCH_FEWSHOT_K = int(os.getenv("PITCH_FEWSHOT_K", "2"))
+
+_TEMPLATE_START = re.compile(r"^Template \d+:")
+
+def split_sample_pitches(text: str) -> List[str]:
+    """Split sample_pitches.txt into individual pitches.
+
+    A pitch starts at a "Template N:" line or at a title line followed by "The Hook:". Other
+    bare headings (e.g. the notes on prompt optimization) end the previous pitch and are dropped.
+    """
+    lines = text.splitlines()
+    blocks, current, keep = [], [], False
+    for i, line in enumerate(lines):
+        next_line = lines[i + 1] if i + 1 < len(lines) else ""
+        is_pitch_start = bool(_TEMPLATE_START.match(line)) or next_line.startswith("The Hook:")
+        is_heading = bool(line.strip()) and ":" not in line and len(line) < 80 and not line.rstrip().endswith(".")
+        if is_pitch_start or is_heading:
+            if keep and current:
+                blocks.append("\n".join(current).strip())
+            current, keep = [line], is_pitch_start
+        else:
+            current.append(line)
+    if keep and current:
+        blocks.append("\n".join(current).strip())
+    return blocks
+
+# (text, pitches, index) for the current sample_pitches.txt; the file itself is loaded (and
+# hot-reloaded) by the prompt registry, and the index is rebuilt only when its text changes
+_sample_pitches: Tuple[str, List[str], Optional[BM25Index]] = ("", [], None)
+
+def sample_pitch_index() -> Tuple[str, List[str], Optional[BM25Index]]:
+    global _sample_pitches
+    sample = prompt_registry.get_sample_pitches()
+    if sample is not _sample_pitches[0]:
+        templates = split_sample_pitches(sample)
+        _sample_pitches = (sample, templates, BM25Index(templates))
+    return _sample_pitches
+
+def select_sample_pitches(data: dict) -> str:
+    sample, templates, index = sample_pitch_index()
+    if PITCH_FEWSHOT_MODE == "full" or not templates:
+        return sample
+    query = " ".join(value for value in data.values() if value)
+    best = index.top_k(query, PITCH_FEWSHOT_K)
+    return "\n\n".join(templates[i] for i in best)
 
 def generate_prompt(data: dict) -> str:
+    examples = select_sample_pitches(data)
     header = f"""
 You are a world-class startup pitch strategist trusted by top-tier venture capital firms to help founders craft pitches that are crisp, credible, and investor-ready.
 
@@ -29,7 +93,7 @@ Your job is to read the detailed information provided by the founder and generat
 - Avoid generic or vague language—be specific and memorable.
 
 Some of the best pitches from where you can take references on how to write a pitch: are:
-{sample}
+{examples}
 these are just refernces. The pitch has to be in First person perspective as if the founder is gonna speak it in front of the VCs.
 Dont give any sections. just a perfect pitch.
 
@@ -49,8 +113,36 @@ Below is the information shared by the founder:
     return header.strip() + founder_data + closing
 
 
-@app.post("/generate-pitch")
+async def generate_pitch_tokens(job: PitchJob):
+    start = time.perf_counter()
+    stream = llm.stream(
+        messages=[
+            {"role": "system", "content": "You are a VC pitch expert helping startups write strong, fundable pitches."},
+            {"role": "user", "content": job.prompt}
+        ],
+        temperature=0.7,
+        stream_options={"include_usage": True}
+    )
+    async for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            record_usage("pitch", chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+    observe_stage("llm_pitch", time.perf_counter() - start)
+
+pitch_jobs = PitchJobQueue(generate=generate_pitch_tokens)
+
+async def get_job_or_404(job_id: str) -> PitchJob:
+    job = await pitch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/generate-pitch")
 async def generate_pitch_form(
+    request: Request,
+    user: Optional[User] = Depends(get_optional_user),
+    wait: bool = Form(False),  # True: block until the pitch is ready and return it (old behaviour)
     core_business_info: str = Form(...),
     company_basics: Optional[str] = Form(None),
     problem_solution: Optional[str] = Form(None),
@@ -123,15 +215,55 @@ async def generate_pitch_form(
 
     prompt = generate_prompt(data)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a VC pitch expert helping startups write strong, fundable pitches."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        
+    # Jobs are capped per signed-in user, or per client address for anonymous callers
+    owner = user.username if user else (request.client.host if request.client else "anonymous")
+    try:
+        job, created = await pitch_jobs.submit(owner, data, prompt)
+    except JobLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many pitch generations in progress.")
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Pitch generation queue is full, please retry.",
+                            headers={"Retry-After": "5"})
+
+    if wait:
+        job = await pitch_jobs.wait(job)
+        if job.status == FAILED:
+            raise HTTPException(status_code=502, detail=job.error)
+        return {"pitch": job.result}
+
+    return JSONResponse(status_code=202, content={**job.to_dict(), "deduplicated": not created})
+
+@router.get("/generate-pitch/jobs/{job_id}")
+async def pitch_job_status(job_id: str):
+    return (await get_job_or_404(job_id)).to_dict()
+
+@router.get("/generate-pitch/jobs/{job_id}/result")
+async def pitch_job_result(job_id: str):
+    job = await get_job_or_404(job_id)
+    if job.status == FAILED:
+        raise HTTPException(status_code=502, detail=job.error)
+    if job.status != DONE:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return {"job_id": job.id, "status": job.status, "pitch": job.result}
+
+@router.get("/generate-pitch/jobs/{job_id}/stream")
+async def pitch_job_stream(job_id: str):
+    job = await get_job_or_404(job_id)
+
+    async def event_stream():
+        async for token in pitch_jobs.stream(job):
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        final = await pitch_jobs.wait(job)
+        yield f"data: {json.dumps({**final.to_dict(), 'pitch': final.result})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    pitch_text = response.choices[0].message.content.strip()
-    return {"pitch": pitch_text}
+# Standalone app, kept for `uvicorn pitch_bot:app --env-file .env` (only app.py loads .env itself);
+# the composed application is app.py
+app = FastAPI(lifespan=compose_lifespans(clients_lifespan, auth_api.lifespan, lifespan))
+app.include_router(router)
+instrument(app)
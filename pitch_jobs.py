@@ -0,0 +1,369 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlite_pool import SQLitePool
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PITCH_JOB_WORKERS = int(os.getenv("PITCH_JOB_WORKERS", "4"))
+PITCH_JOB_PER_USER = int(os.getenv("PITCH_JOB_PER_USER", "2"))
+PITCH_JOB_MAX_QUEUED = int(os.getenv("PITCH_JOB_MAX_QUEUED", "100"))
+PITCH_JOB_RESULT_TTL = float(os.getenv("PITCH_JOB_RESULT_TTL", str(60 * 60)))
+# Jobs live in SQLite so every uvicorn worker can accept, run, poll and stream any job
+PITCH_JOB_DB_PATH = os.getenv("PITCH_JOB_DB_PATH", "pitch_jobs.db")
+PITCH_JOB_POLL = float(os.getenv("PITCH_JOB_POLL", "0.2"))                   # idle workers / remote followers
+PITCH_JOB_PROGRESS_INTERVAL = float(os.getenv("PITCH_JOB_PROGRESS_INTERVAL", "0.25"))  # partial text writes
+PITCH_JOB_HEARTBEAT = float(os.getenv("PITCH_JOB_HEARTBEAT", "10"))
+PITCH_JOB_STALE_SECONDS = float(os.getenv("PITCH_JOB_STALE_SECONDS", "60"))  # running job with a dead worker
+
+
+class JobLimitExceeded(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+def submission_key(data: dict) -> str:
+    # Identical submissions (ignoring case, whitespace and empty fields) share one job
+    normalized = {k: " ".join(v.split()).lower() for k, v in data.items() if v and v.strip()}
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PitchJob:
+    id: str
+    key: str
+    owner: str
+    prompt: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    tokens: List[str] = field(default_factory=list)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_row(cls, row) -> "PitchJob":
+        return cls(
+            id=row["id"], key=row["key"], owner=row["owner"], prompt=row["prompt"], status=row["status"],
+            created_at=row["created_at"], started_at=row["started_at"], finished_at=row["finished_at"],
+            tokens=[row["partial"]] if row["partial"] else [], result=row["result"], error=row["error"],
+        )
+
+    def refresh(self, row):
+        # Catch a job followed from another worker up with its stored row
+        self.status, self.started_at, self.finished_at = row["status"], row["started_at"], row["finished_at"]
+        self.result, self.error = row["result"], row["error"]
+        seen = sum(len(token) for token in self.tokens)
+        if row["partial"] and len(row["partial"]) > seen:
+            self.tokens.append(row["partial"][seen:])
+
+
+class PitchJobStore:
+    """SQLite table of pitch jobs shared by all worker processes.
+
+    Admission (dedup, per-owner cap, queue bound) runs in one ``BEGIN IMMEDIATE``
+    transaction, so the limits are global rather than per worker.
+    """
+
+    def __init__(self, path: str = PITCH_JOB_DB_PATH, pool_size: int = 4):
+        self.db_pool = SQLitePool(path, size=pool_size)
+
+    def create_tables(self):
+        with self.db_pool.transaction() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS pitch_jobs (
+                id TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL,
+                worker TEXT,
+                partial TEXT NOT NULL DEFAULT '',
+                result TEXT,
+                error TEXT
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pitch_jobs_key ON pitch_jobs(key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pitch_jobs_status ON pitch_jobs(status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pitch_jobs_owner ON pitch_jobs(owner, status)")
+
+    def close(self):
+        self.db_pool.close()
+
+    def submit(self, key: str, owner: str, prompt: str, per_user: int, max_queued: int,
+               result_ttl: float) -> Tuple[PitchJob, bool]:
+        now = time.time()
+        with self.db_pool.transaction() as conn:
+            conn.execute("DELETE FROM pitch_jobs WHERE finished_at < ?", (now - result_ttl,))
+            existing = conn.execute(
+                "SELECT * FROM pitch_jobs WHERE key = ? AND status != ? ORDER BY created_at DESC LIMIT 1",
+                (key, FAILED),
+            ).fetchone()
+            if existing is not None:
+                return PitchJob.from_row(existing), False
+
+            active = conn.execute(
+                "SELECT COUNT(*) FROM pitch_jobs WHERE owner = ? AND status IN (?, ?)", (owner, QUEUED, RUNNING)
+            ).fetchone()[0]
+            if active >= per_user:
+                raise JobLimitExceeded()
+            queued = conn.execute("SELECT COUNT(*) FROM pitch_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued >= max_queued:
+                raise QueueFull()
+
+            job = PitchJob(id=uuid.uuid4().hex, key=key, owner=owner, prompt=prompt, created_at=now)
+            conn.execute(
+                "INSERT INTO pitch_jobs (id, key, owner, prompt, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, key, owner, prompt, QUEUED, now),
+            )
+            return job, True
+
+    def claim(self, worker: str) -> Optional[PitchJob]:
+        # The oldest queued job, marked running by this worker; idle polls stay read-only
+        with self.db_pool.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM pitch_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        with self.db_pool.transaction() as conn:
+            claimed = conn.execute(
+                "UPDATE pitch_jobs SET status = ?, started_at = ?, heartbeat_at = ?, worker = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, now, now, worker, row["id"], QUEUED),
+            ).rowcount
+        if not claimed:
+            return None  # another worker got there first
+        job = PitchJob.from_row(row)
+        job.status, job.started_at = RUNNING, now
+        return job
+
+    def fail_stale(self):
+        # Running jobs whose worker stopped heartbeating, e.g. the process was killed
+        now = time.time()
+        with self.db_pool.transaction() as conn:
+            conn.execute(
+                "UPDATE pitch_jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND heartbeat_at < ?",
+                (FAILED, "Worker stopped", now, RUNNING, now - PITCH_JOB_STALE_SECONDS),
+            )
+
+    def load(self, job_id: str):
+        with self.db_pool.connection() as conn:
+            return conn.execute("SELECT * FROM pitch_jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def save_progress(self, job_id: str, partial: str):
+        with self.db_pool.transaction() as conn:
+            conn.execute("UPDATE pitch_jobs SET partial = ?, heartbeat_at = ? WHERE id = ?",
+                         (partial, time.time(), job_id))
+
+    def heartbeat(self, job_ids: List[str]):
+        now = time.time()
+        with self.db_pool.transaction() as conn:
+            conn.executemany("UPDATE pitch_jobs SET heartbeat_at = ? WHERE id = ?", [(now, i) for i in job_ids])
+
+    def finish(self, job: PitchJob):
+        with self.db_pool.transaction() as conn:
+            conn.execute(
+                "UPDATE pitch_jobs SET status = ?, finished_at = ?, partial = ?, result = ?, error = ? WHERE id = ?",
+                (job.status, job.finished_at, "".join(job.tokens), job.result, job.error, job.id),
+            )
+
+
+class PitchJobQueue:
+    """Job queue for pitch generation, shared by all worker processes through ``PitchJobStore``.
+
+    Each process runs a fixed number of workers that claim queued jobs from the store; each
+    owner may have at most ``per_user`` unfinished jobs, and identical normalized submissions
+    are deduplicated onto the same job while it is pending or its result is still retained.
+    Jobs running in this process are followed token by token; jobs running elsewhere are
+    followed by polling their stored progress every ``PITCH_JOB_POLL`` seconds.
+    """
+
+    def __init__(self, generate: Callable[[PitchJob], AsyncIterator[str]], workers: int = PITCH_JOB_WORKERS,
+                 per_user: int = PITCH_JOB_PER_USER, max_queued: int = PITCH_JOB_MAX_QUEUED,
+                 result_ttl: float = PITCH_JOB_RESULT_TTL, store: Optional[PitchJobStore] = None):
+        self.generate = generate
+        self.workers = workers
+        self.per_user = per_user
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.store = store or PitchJobStore()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[str, PitchJob] = {}   # jobs executing in this process
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # --- Lifecycle ---
+    async def start(self):
+        if self._tasks:
+            return
+        await asyncio.to_thread(self.store.create_tables)
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._heartbeat()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    # --- Public API ---
+    async def submit(self, owner: str, data: dict, prompt: str):
+        """Return ``(job, created)``; ``created`` is False when an identical job is reused."""
+        job, created = await asyncio.to_thread(
+            self.store.submit, submission_key(data), owner, prompt, self.per_user, self.max_queued, self.result_ttl)
+        if created:
+            self._wakeup.set()
+        return self._running.get(job.id, job), created
+
+    async def get(self, job_id: str) -> Optional[PitchJob]:
+        job = self._running.get(job_id)
+        if job is not None:
+            return job
+        row = await asyncio.to_thread(self.store.load, job_id)
+        return PitchJob.from_row(row) if row is not None else None
+
+    async def _follow(self, job: PitchJob) -> PitchJob:
+        # Switch to the live job once it runs here; otherwise refresh from the store
+        live = self._running.get(job.id)
+        if live is not None:
+            return live
+        await asyncio.sleep(PITCH_JOB_POLL)
+        row = await asyncio.to_thread(self.store.load, job.id)
+        if row is None:
+            job.status, job.error, job.finished_at = FAILED, "Job expired", time.time()
+        else:
+            job.refresh(row)
+        return job
+
+    async def wait(self, job: PitchJob) -> PitchJob:
+        while not job.finished:
+            if job.id in self._running:
+                job = self._running[job.id]
+                async with job.changed:
+                    await job.changed.wait_for(lambda: job.finished)
+            else:
+                job = await self._follow(job)
+        return job
+
+    async def stream(self, job: PitchJob) -> AsyncIterator[str]:
+        # Replays text produced so far, then follows the job until it finishes. Offsets are kept
+        # in characters: a job followed from the store holds its text in a few large chunks.
+        sent = 0
+        while True:
+            if job.id in self._running:
+                job = self._running[job.id]
+                async with job.changed:
+                    await job.changed.wait_for(lambda: sum(map(len, job.tokens)) > sent or job.finished)
+            elif sum(map(len, job.tokens)) == sent and not job.finished:
+                job = await self._follow(job)
+            finished = job.finished
+            offset = 0
+            for token in list(job.tokens):
+                end = offset + len(token)
+                if end > sent:
+                    yield token[max(0, sent - offset):]
+                    sent = end
+                offset = end
+            if finished and sent == offset:
+                return
+
+    # --- Internals ---
+    async def _notify(self, job: PitchJob):
+        async with job.changed:
+            job.changed.notify_all()
+
+    async def _next_job(self) -> PitchJob:
+        while True:
+            job = await asyncio.to_thread(self.store.claim, self.worker_id)
+            if job is not None:
+                return job
+            # Woken at once by submissions to this process, by polling for other workers' ones
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), PITCH_JOB_POLL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            job = await self._next_job()
+            self._running[job.id] = job
+            await self._notify(job)
+            written = 0
+            last_write = time.monotonic()
+            try:
+                async for token in self.generate(job):
+                    job.tokens.append(token)
+                    await self._notify(job)
+                    if time.monotonic() - last_write >= PITCH_JOB_PROGRESS_INTERVAL and len(job.tokens) > written:
+                        written, last_write = len(job.tokens), time.monotonic()
+                        await asyncio.to_thread(self.store.save_progress, job.id, "".join(job.tokens))
+                job.result = "".join(job.tokens).strip()
+                job.status = DONE
+            except asyncio.CancelledError:
+                job.status, job.error = FAILED, "Cancelled"
+                raise
+            except Exception as e:
+                logger.exception("Pitch job %s failed", job.id)
+                job.status, job.error = FAILED, str(e)
+            finally:
+                job.finished_at = time.time()
+                try:
+                    await asyncio.to_thread(self.store.finish, job)
+                except Exception:
+                    logger.exception("Storing pitch job %s failed", job.id)
+                del self._running[job.id]
+                await self._notify(job)
+
+    async def _heartbeat(self):
+        # Keeps this process's running jobs alive and fails those left behind by a dead one
+        while True:
+            await asyncio.sleep(PITCH_JOB_HEARTBEAT)
+            try:
+                if self._running:
+                    await asyncio.to_thread(self.store.heartbeat, list(self._running))
+                await asyncio.to_thread(self.store.fail_stale)
+            except Exception:
+                logger.exception("Pitch job heartbeat failed")
@@ -1,9 +1,13 @@
-import os
-from groq import Groq
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+from clients import registry as clients
+from llm_router import LLMRouter
+
+# Groq by default; any LLM_BACKENDS-style list, e.g. "groq:llama3-70b-8192,openai:gpt-4o-mini"
+llm = LLMRouter.from_env("PITCH_QUESTION_BACKENDS", "groq:llama3-70b-8192")
 
 system_prompt = """
 You are a seasoned Venture Capitalist (VC) with expertise in evaluating startup pitches.
@@ -23,21 +27,18 @@ Be thoughtful, critical, and constructive. Ask follow-ups if needed.
 
 conversation = [{"role": "system", "content": system_prompt}]
 
-def chat_with_groq():
+async def chat_with_groq():
     print("👩‍💼 VC: Hello Founder! Please paste your pitch below to get started.\n")
 
     while True:
-        user_input = input("🧑‍💼 Founder: ")
+        user_input = await asyncio.to_thread(input, "🧑‍💼 Founder: ")
         if user_input.lower().strip() == "exit":
             print("\n📊 VC: Thank you. Let me evaluate your pitch...\n")
             break
 
         conversation.append({"role": "user", "content": user_input})
 
-        response = client.chat.completions.create(
-            messages=conversation,
-            model="llama3-70b-8192"
-        )
+        response = await llm.create(conversation)
 
         assistant_reply = response.choices[0].message.content.strip()
         print(f"\n👩‍💼 VC: {assistant_reply}\n")
@@ -55,14 +56,17 @@ Be specific and professional, dont give html in return.
 """
     conversation.append({"role": "user", "content": evaluation_prompt})
 
-    final_eval = client.chat.completions.create(
-        messages=conversation,
-        model="llama3-70b-8192"
-    )
+    final_eval = await llm.create(conversation)
     final_feedback = final_eval.choices[0].message.content.strip()
 
     print("\n Final Evaluation:")
     print(final_feedback)
 
+async def main():
+    try:
+        await chat_with_groq()
+    finally:
+        await clients.close()
+
 if __name__ == "__main__":
-    chat_with_groq()
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from question_bank import QuestionBank
+
+PERSONALITY_DIR = "vc_personalities"
+QUESTIONS_PATH = "questions.txt"
+SAMPLE_PITCHES_PATH = "sample_pitches.txt"
+DEFAULT_PERSONALITY = "You are a seasoned and thoughtful VC."  # Fallback
+
+# "retrieve": per-turn question suggestions (see question_bank); "full": whole bank in the prompt
+QUESTION_BANK_MODE = os.getenv("QUESTION_BANK_MODE", "retrieve")
+
+# How often (seconds) file mtimes are re-checked for hot reload
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+# Identical for every VC, so it forms a stable prefix that provider-side prompt caching can reuse.
+SHARED_PREFIX_TEMPLATE = """
+You are a seasoned Venture Capitalist (VC) with expertise in evaluating startup pitches.
+
+Your job is to:
+1. Carefully analyze the founder's pitch.
+2. Ask insightful, high-quality questions one at a time.
+3. Wait for the founder's answer before asking the next question.
+4. End the session when you're satisfied or the founder types "exit".
+5. Don't ask very long questions. Ask one question at a time only — strictly.
+6. After the Q&A ends, evaluate the pitch and answers:
+   - Give a score out of 10.
+   - List 2-3 strengths.
+   - List 2-3 areas for improvement.
+   - Conclude with a final verdict: Invest / Needs Work / Pass.
+
+Be thoughtful, critical, and constructive. Ask follow-ups if needed.
+{questions_section}
+And here are some example founder pitches to guide your expectations:
+-----
+{sample_pitches}
+-----
+"""
+
+FULL_QUESTIONS_SECTION = """
+Below are examples of good questions you may be inspired by:
+-----
+{sample_questions}
+-----
+"""
+
+# With retrieval, a few bank questions relevant to the current turn are sent with each turn instead
+RETRIEVED_QUESTIONS_SECTION = """
+Each turn may include a short list of question-bank suggestions relevant to the founder's last
+answer, prioritizing topics not covered yet. Use them as inspiration, not as a script.
+"""
+
+PERSONALITY_TEMPLATE = """
+Your personality: {vc_name}
+{description}
+
+Now, begin the session.
+"""
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+class PromptRegistry:
+    """Renders and caches the per-VC system prompts.
+
+    All personality files are read once and every rendered prompt is cached; files are
+    re-read only when their mtime changes. Names resolve case-insensitively against the
+    file names, so "kevin" and "KEVIN" both map to ``Kevin.txt``.
+    """
+
+    def __init__(self, personality_dir: str = PERSONALITY_DIR, questions_path: str = QUESTIONS_PATH,
+                 pitches_path: str = SAMPLE_PITCHES_PATH, reload_interval: float = PROMPT_RELOAD_INTERVAL,
+                 question_bank_mode: str = QUESTION_BANK_MODE):
+        self.personality_dir = personality_dir
+        self.questions_path = questions_path
+        self.pitches_path = pitches_path
+        self.reload_interval = reload_interval
+        self.question_bank_mode = question_bank_mode
+        self.question_bank: Optional[QuestionBank] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self._mtimes: Dict[str, float] = {}
+        self._names: Dict[str, str] = {}            # lower-case name → canonical file stem
+        self._personalities: Dict[str, str] = {}    # canonical name → description
+        self._prompts: Dict[str, str] = {}          # canonical name → rendered prompt
+        self.shared_prefix = ""
+
+    @property
+    def retrieves_questions(self) -> bool:
+        return self.question_bank_mode != "full"
+
+    def get_question_bank(self) -> QuestionBank:
+        self._maybe_reload()
+        return self.question_bank
+
+    def get_sample_pitches(self) -> str:
+        self._maybe_reload()
+        return self.sample_pitches
+
+    def load(self):
+        with self._lock:
+            self._load_shared()
+            self._load_personalities()
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+    def _load_shared(self):
+        self.sample_questions = _read(self.questions_path)
+        self.sample_pitches = _read(self.pitches_path)
+        self.question_bank = QuestionBank.from_text(self.sample_questions)
+        if self.question_bank_mode == "full":
+            questions_section = FULL_QUESTIONS_SECTION.format(sample_questions=self.sample_questions)
+        else:
+            questions_section = RETRIEVED_QUESTIONS_SECTION
+        self.shared_prefix = SHARED_PREFIX_TEMPLATE.format(
+            questions_section=questions_section,
+            sample_pitches=self.sample_pitches,
+        )
+        self._mtimes[self.questions_path] = _mtime(self.questions_path)
+        self._mtimes[self.pitches_path] = _mtime(self.pitches_path)
+        self._prompts.clear()
+
+    def _load_personalities(self):
+        names, personalities = {}, {}
+        for entry in os.scandir(self.personality_dir):
+            stem, ext = os.path.splitext(entry.name)
+            if ext != ".txt" or not entry.is_file():
+                continue
+            names[stem.lower()] = stem
+            personalities[stem] = _read(entry.path)
+            self._mtimes[entry.path] = entry.stat().st_mtime
+        self._names, self._personalities = names, personalities
+        self._prompts.clear()
+
+    def _personality_mtimes(self) -> Dict[str, float]:
+        return {
+            entry.path: entry.stat().st_mtime
+            for entry in os.scandir(self.personality_dir)
+            if entry.name.endswith(".txt") and entry.is_file()
+        }
+
+    def _maybe_reload(self):
+        if not self._loaded:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            if any(_mtime(p) != self._mtimes.get(p) for p in (self.questions_path, self.pitches_path)):
+                self._load_shared()
+            current = self._personality_mtimes()
+            known = {p: m for p, m in self._mtimes.items() if p.startswith(self.personality_dir)}
+            if current != known:
+                for path in known:
+                    self._mtimes.pop(path, None)
+                self._load_personalities()
+
+    def resolve(self, vc_name: str) -> Optional[str]:
+        self._maybe_reload()
+        return self._names.get(vc_name.strip().lower())
+
+    def canonical_name(self, vc_name: Optional[str]) -> str:
+        # The name a personality is recorded under, e.g. for evaluation dashboards
+        vc_name = (vc_name or "").strip() or "Default"
+        return self.resolve(vc_name) or vc_name
+
+    def system_prompt(self, vc_name: str) -> str:
+        name = self.resolve(vc_name)
+        if name is None:
+            return self.shared_prefix + PERSONALITY_TEMPLATE.format(vc_name=vc_name, description=DEFAULT_PERSONALITY)
+
+        prompt = self._prompts.get(name)
+        if prompt is None:
+            prompt = self.shared_prefix + PERSONALITY_TEMPLATE.format(
+                vc_name=name, description=self._personalities[name]
+            )
+            self._prompts[name] = prompt
+        return prompt
+
+
+registry = PromptRegistry()
@@ -0,0 +1,81 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set
+
+from retrieval import BM25Index
+
+_QUESTION_LINE = re.compile(r"^\s*(\d+)\s+(.+?)\s*$")
+
+# Minimum BM25 score for a VC message to count as covering a question's category
+COVERAGE_MIN_SCORE = 2.0
+
+
+@dataclass(frozen=True)
+class Question:
+    number: int
+    category: str
+    text: str
+
+
+def parse_question_bank(text: str) -> List[Question]:
+    # questions.txt: a category title line, followed by "<number>\t<question>" lines
+    questions, category = [], "General"
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = _QUESTION_LINE.match(line)
+        if match:
+            questions.append(Question(int(match.group(1)), category, match.group(2)))
+        else:
+            category = line.strip()
+    return questions
+
+
+class QuestionBank:
+    """Categorized sample questions, indexed for per-turn retrieval."""
+
+    def __init__(self, questions: List[Question]):
+        self.questions = questions
+        self.categories = list(dict.fromkeys(q.category for q in questions))
+        self._index = BM25Index([f"{q.category}. {q.text}" for q in questions])
+
+    @classmethod
+    def from_text(cls, text: str) -> "QuestionBank":
+        return cls(parse_question_bank(text))
+
+    def categorize(self, text: str) -> Optional[str]:
+        # Category of the bank question closest to ``text`` (e.g. a question the VC just asked)
+        if not self.questions:
+            return None
+        scores = self._index.scores(text)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return self.questions[best].category if scores[best] >= COVERAGE_MIN_SCORE else None
+
+    def covered_categories(self, vc_messages: Iterable[str]) -> Set[str]:
+        covered = set()
+        for text in vc_messages:
+            category = self.categorize(text)
+            if category:
+                covered.add(category)
+        return covered
+
+    def suggest(self, founder_message: str, covered: Set[str], k: int = 5, per_category: int = 2) -> List[Question]:
+        """Questions most relevant to what the founder just said, favouring uncovered categories."""
+        scores = self._index.scores(founder_message)
+        ranked = sorted(
+            range(len(self.questions)),
+            key=lambda i: (self.questions[i].category in covered, -scores[i], i),
+        )
+        picked, per = [], {}
+        for i in ranked:
+            question = self.questions[i]
+            if per.get(question.category, 0) >= per_category:
+                continue
+            per[question.category] = per.get(question.category, 0) + 1
+            picked.append(question)
+            if len(picked) == k:
+                break
+        return picked
+
+    def render(self, questions: List[Question]) -> str:
+        return "\n".join(f"- [{q.category}] {q.text}" for q in questions)
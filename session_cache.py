@@ -0,0 +1,353 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import session_store
+from metrics import SESSION_BYTES, timed
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+EVALUATED = "evaluated"
+
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))
+# "shared" (default): several processes may serve the same sessions; turns take a lease in the
+# session store, cached sessions are revalidated against the stored version and every turn is
+# written through. uvicorn --workers does not tell the workers how many there are, so this is
+# the safe default. "local": a single process owns every session (write-behind, in-process turn
+# locks); only for deployments that run exactly one process.
+SESSION_COORDINATION = os.getenv("SESSION_COORDINATION", "shared")
+# How long an overlapping turn for the same session queues before it is rejected (0: reject at once)
+SESSION_TURN_WAIT = float(os.getenv("SESSION_TURN_WAIT", "30"))
+SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "30"))  # renewed while the turn runs
+SESSION_LEASE_POLL = float(os.getenv("SESSION_LEASE_POLL", "0.1"))
+
+# Rough per-message bookkeeping overhead (dict + two strings) on top of the text itself
+_MESSAGE_OVERHEAD = 200
+
+
+async def _acquire(lock: asyncio.Lock, timeout: float) -> bool:
+    """Acquire ``lock`` within ``timeout`` seconds; on False the lock is not held."""
+    if hasattr(asyncio, "timeout"):  # 3.11+
+        try:
+            async with asyncio.timeout(timeout):
+                await lock.acquire()
+            return True
+        except TimeoutError:
+            return False
+    # wait_for before 3.12 can time out after the acquire went through, leaving the lock held
+    acquire = asyncio.ensure_future(lock.acquire())
+    try:
+        await asyncio.wait({acquire}, timeout=timeout)
+    finally:
+        if not acquire.done():
+            acquire.cancel()
+            # Should the acquire still win the race with its cancellation, give the lock back
+            acquire.add_done_callback(lambda task: task.cancelled() or lock.release())
+    return acquire.done() and not acquire.cancelled()
+
+
+def _message_size(message: Dict) -> int:
+    return len(message["content"]) + _MESSAGE_OVERHEAD
+
+
+class SessionBusy(Exception):
+    """Another turn for the session did not finish within ``SESSION_TURN_WAIT``."""
+
+
+@dataclass
+class SessionEntry:
+    session_id: str
+    messages: List[Dict]
+    vc_name: Optional[str] = None
+    state: str = ACTIVE
+    size: int = 0
+    version: int = 0          # bumped on every change
+    flushed_version: int = 0  # last version written to the store
+    store_version: int = 0    # the store's version of the session these messages correspond to
+    reset: bool = False       # next flush must rewrite the session instead of appending
+    summary: str = ""         # rolling summary of messages[1:summarized_upto] (see context_window), persisted
+    summarized_upto: int = 1
+    covered_categories: Optional[Set[str]] = None  # question-bank categories the VC has asked about
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+
+class SessionCache:
+    """Bounded LRU of live sessions with write-behind persistence to ``session_store``.
+
+    Reads of hot sessions never leave memory. Changes are marked dirty and flushed by a
+    background task in a single store transaction every ``flush_interval`` seconds, and once
+    more on shutdown. Only clean entries are evicted, so nothing unflushed is ever dropped.
+
+    Turns for one session run one at a time (see ``turn``). With ``coordination="shared"``
+    that also holds across worker processes, and each turn is written through with an
+    optimistic version check instead of waiting for the flusher.
+    """
+
+    def __init__(self, evaluated_marker: str, max_bytes: int = SESSION_CACHE_MAX_BYTES,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL, coordination: str = SESSION_COORDINATION):
+        self.evaluated_marker = evaluated_marker
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.shared = coordination == "shared"
+        # Lease owner id of this worker process
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._entries: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._dirty: Dict[str, SessionEntry] = {}
+        self._bytes = 0
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._turn_locks: Dict[str, asyncio.Lock] = {}
+        self._turn_users: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                # Entries stay dirty and are retried on the next tick
+                logger.exception("Session flush failed")
+
+    # --- Turns ---
+    @asynccontextmanager
+    async def turn(self, session_id: str, wait: float = SESSION_TURN_WAIT):
+        """Run one turn (read, LLM call, update) for ``session_id`` exclusively.
+
+        Overlapping turns queue for up to ``wait`` seconds and then raise SessionBusy. In shared
+        mode the lease in the session store extends this to other workers, and the session is
+        written through before the turn ends (SessionConflict if another writer got in between).
+        """
+        deadline = time.monotonic() + wait
+        lock = self._turn_locks.setdefault(session_id, asyncio.Lock())
+        self._turn_users[session_id] = self._turn_users.get(session_id, 0) + 1
+        heartbeat = None
+        leased = False
+        try:
+            with timed("session_lock"):
+                if lock.locked():
+                    if not await _acquire(lock, max(0.0, deadline - time.monotonic())):
+                        raise SessionBusy(session_id)
+                else:
+                    await lock.acquire()
+                if self.shared:
+                    try:
+                        while not await asyncio.to_thread(
+                                session_store.acquire_lease, session_id, self.owner, SESSION_LEASE_SECONDS):
+                            if time.monotonic() >= deadline:
+                                raise SessionBusy(session_id)
+                            await asyncio.sleep(SESSION_LEASE_POLL)
+                    except BaseException:
+                        lock.release()
+                        raise
+                    leased = True
+                    heartbeat = asyncio.create_task(self._renew_lease(session_id))
+            try:
+                yield
+            finally:
+                try:
+                    entry = self._entries.get(session_id)
+                    if self.shared and entry is not None and entry.dirty:
+                        await self._write_through(entry)
+                finally:
+                    if heartbeat is not None:
+                        heartbeat.cancel()
+                    if leased:
+                        await asyncio.to_thread(session_store.release_lease, session_id, self.owner)
+                    lock.release()
+        finally:
+            self._turn_users[session_id] -= 1
+            if not self._turn_users[session_id]:
+                del self._turn_users[session_id]
+                del self._turn_locks[session_id]
+
+    async def _renew_lease(self, session_id: str):
+        while True:
+            await asyncio.sleep(SESSION_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(
+                        session_store.renew_lease, session_id, self.owner, SESSION_LEASE_SECONDS):
+                    # Expired and taken over; the version check on write-through catches the overlap
+                    logger.warning("Lost the lease on session %s", session_id)
+                    return
+            except Exception:
+                logger.exception("Renewing the lease on session %s failed", session_id)
+
+    # --- Reads ---
+    async def get(self, session_id: str) -> Optional[SessionEntry]:
+        entry = self._entries.get(session_id)
+        if entry is not None and self.shared and not entry.dirty:
+            # Another worker may have written a turn since this copy was loaded
+            version = await asyncio.to_thread(session_store.get_version, session_id)
+            if version != entry.store_version:
+                self._discard(session_id)
+                entry = None
+        if entry is not None:
+            self._entries.move_to_end(session_id)
+            return entry
+
+        with timed("session_load"):
+            messages, version, vc_name, summary, summarized_upto = await asyncio.to_thread(
+                session_store.load_session_state, session_id)
+        if messages is None:
+            return None
+        # Another request may have loaded it while we were waiting on the store
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            return entry
+
+        # The completion scan happens once per load instead of on every turn
+        state = EVALUATED if any(m["content"] == self.evaluated_marker for m in messages) else ACTIVE
+        entry = SessionEntry(session_id=session_id, messages=messages, vc_name=vc_name, state=state,
+                             store_version=version, summary=summary, summarized_upto=summarized_upto)
+        self._insert(entry)
+        return entry
+
+    def peek(self, session_id: str) -> Optional[SessionEntry]:
+        return self._entries.get(session_id)
+
+    # --- Writes ---
+    def update(self, session_id: str, messages: List[Dict], vc_name: Optional[str] = None,
+               evaluated: bool = False) -> SessionEntry:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = SessionEntry(session_id=session_id, messages=messages, vc_name=vc_name)
+            self._insert(entry)
+        else:
+            self._bytes -= entry.size
+            entry.messages = messages
+            entry.size = sum(_message_size(m) for m in messages)
+            self._bytes += entry.size
+            entry.vc_name = entry.vc_name or vc_name
+            self._entries.move_to_end(session_id)
+        if evaluated:
+            entry.state = EVALUATED
+        self._mark_dirty(entry)
+        return entry
+
+    def reset(self, session_id: str, system_prompt: str, vc_name: Optional[str] = None) -> SessionEntry:
+        self._discard(session_id)
+        entry = SessionEntry(
+            session_id=session_id,
+            messages=[{"role": "system", "content": system_prompt}],
+            vc_name=vc_name,
+            reset=True,
+        )
+        self._insert(entry)
+        self._mark_dirty(entry)
+        return entry
+
+    async def _write_through(self, entry: SessionEntry):
+        version = entry.version
+        try:
+            with timed("session_flush"):
+                entry.store_version = await asyncio.to_thread(
+                    session_store.save_session_versioned, entry.session_id, list(entry.messages),
+                    entry.vc_name, entry.reset, entry.store_version, entry.summary, entry.summarized_upto)
+        except session_store.SessionConflict:
+            # This copy is stale; the next turn starts from what the other worker stored
+            self._discard(entry.session_id)
+            raise
+        SESSION_BYTES.observe(entry.size)
+        entry.flushed_version = version
+        if entry.version == version:
+            entry.reset = False
+            if self._dirty.get(entry.session_id) is entry:
+                del self._dirty[entry.session_id]
+
+    async def flush(self):
+        if self.shared:
+            # Retries write-throughs that failed; sessions with a turn running write their own
+            for entry in list(self._dirty.values()):
+                if entry.session_id in self._turn_locks:
+                    continue
+                try:
+                    await self._write_through(entry)
+                except session_store.SessionConflict:
+                    logger.warning("Dropped stale changes to session %s", entry.session_id)
+            self._evict()
+            return
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            pending = list(self._dirty.values())
+            batch = []
+            for entry in pending:
+                batch.append((entry.session_id, list(entry.messages), entry.vc_name, entry.reset,
+                              entry.summary, entry.summarized_upto))
+                SESSION_BYTES.observe(entry.size)
+            versions = [entry.version for entry in pending]
+
+            with timed("session_flush"):
+                await asyncio.to_thread(session_store.save_sessions, batch)
+
+            for entry, version in zip(pending, versions):
+                entry.flushed_version = version
+                if entry.version == version:
+                    entry.reset = False
+                    if self._dirty.get(entry.session_id) is entry:
+                        del self._dirty[entry.session_id]
+            self._evict()
+
+    # --- Internals ---
+    def _insert(self, entry: SessionEntry):
+        entry.size = sum(_message_size(m) for m in entry.messages)
+        self._entries[entry.session_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _discard(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        self._dirty.pop(session_id, None)
+
+    def _mark_dirty(self, entry: SessionEntry):
+        entry.version += 1
+        self._dirty[entry.session_id] = entry
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for session_id in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            entry = self._entries[session_id]
+            # Sessions in a turn stay pinned: update() needs their store_version and summary
+            if entry.dirty or session_id in self._turn_locks:
+                continue
+            del self._entries[session_id]
+            self._bytes -= entry.size
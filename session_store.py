@@ -0,0 +1,292 @@
+import os
+import re
+import glob
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import sqlite_pool
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+
+# --- SQLite Setup ---
+# Sessions live in one WAL-mode database: the (large, shared) system prompt is stored once
+# per content hash and each turn only appends its new messages.
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_DB_SYNCHRONOUS = os.getenv("SESSION_DB_SYNCHRONOUS", "FULL")
+LEGACY_SESSION_DIR = "conversations"
+
+class SessionConflict(Exception):
+    """The stored session changed since it was loaded (another worker wrote a turn)."""
+
+_local = threading.local()
+
+def get_db() -> sqlite3.Connection:
+    # One connection per thread; sqlite3 connections must not be shared across threads
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        # Writes arrive in batches from the session cache, so a full fsync per commit is affordable
+        conn = sqlite_pool.connect(SESSION_DB_PATH, synchronous=SESSION_DB_SYNCHRONOUS)
+        _local.conn = conn
+    return conn
+
+@contextmanager
+def transaction():
+    conn = get_db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+_ADDED_SESSION_COLUMNS = {
+    "version": "INTEGER NOT NULL DEFAULT 0",
+    # Rolling summary of messages[1:summarized_upto] (see context_window), so it survives
+    # eviction, restarts and other workers instead of being rebuilt in one large call
+    "summary": "TEXT NOT NULL DEFAULT ''",
+    "summarized_upto": "INTEGER NOT NULL DEFAULT 1",
+}
+
+def create_session_tables():
+    conn = get_db()
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS prompts (
+        hash TEXT PRIMARY KEY,
+        content TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        prompt_hash TEXT NOT NULL REFERENCES prompts(hash),
+        vc_name TEXT,
+        message_count INTEGER NOT NULL DEFAULT 1,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        summary TEXT NOT NULL DEFAULT '',
+        summarized_upto INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (session_id, seq)
+    ) WITHOUT ROWID;
+    -- Which worker is running a turn for a session (multi-worker mode, see session_cache)
+    CREATE TABLE IF NOT EXISTS session_leases (
+        session_id TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    """)
+    # Databases created before these columns existed
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(sessions)")}
+    for name, definition in _ADDED_SESSION_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE sessions ADD COLUMN {name} {definition}")
+
+def prompt_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _store_prompt(conn: sqlite3.Connection, content: str) -> str:
+    digest = prompt_hash(content)
+    conn.execute("INSERT OR IGNORE INTO prompts (hash, content) VALUES (?, ?)", (digest, content))
+    return digest
+
+def _insert_messages(conn: sqlite3.Connection, session_id: str, messages: List[Dict], start_seq: int):
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+        [(session_id, start_seq + i, m["role"], m["content"], now) for i, m in enumerate(messages)],
+    )
+
+def _vc_name_from_prompt(system_prompt: str) -> Optional[str]:
+    match = re.search(r"^Your personality: (.+)$", system_prompt, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+# --- Session API ---
+def load_session(session_id: str) -> Optional[List[Dict]]:
+    conn = get_db()
+    row = conn.execute(
+        "SELECT p.content FROM sessions s JOIN prompts p ON p.hash = s.prompt_hash WHERE s.session_id = ?",
+        (session_id,),
+    ).fetchone()
+    if row is None:
+        # Sessions written before the store existed are imported on first access
+        legacy_path = os.path.join(LEGACY_SESSION_DIR, f"{session_id}.json")
+        if os.path.exists(legacy_path) and import_json_session(legacy_path):
+            return load_session(session_id)
+        return None
+
+    conversation = [{"role": "system", "content": row["content"]}]
+    cur = conn.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,))
+    conversation.extend({"role": r["role"], "content": r["content"]} for r in cur)
+    return conversation
+
+def get_vc_name(session_id: str) -> Optional[str]:
+    row = get_db().execute("SELECT vc_name FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+    return row["vc_name"] if row else None
+
+def list_sessions() -> List[str]:
+    return [row["session_id"] for row in get_db().execute("SELECT session_id FROM sessions ORDER BY session_id")]
+
+def _reset(conn: sqlite3.Connection, session_id: str, system_prompt: str, vc_name: Optional[str]):
+    now = time.time()
+    digest = _store_prompt(conn, system_prompt)
+    conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+    conn.execute("""
+    INSERT INTO sessions (session_id, prompt_hash, vc_name, message_count, created_at, updated_at)
+    VALUES (?, ?, ?, 1, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        prompt_hash = excluded.prompt_hash,
+        vc_name = COALESCE(excluded.vc_name, sessions.vc_name),
+        message_count = 1, updated_at = excluded.updated_at, version = sessions.version + 1,
+        summary = '', summarized_upto = 1
+    """, (session_id, digest, vc_name or _vc_name_from_prompt(system_prompt), now, now))
+
+def _save(conn: sqlite3.Connection, session_id: str, conversation: List[Dict],
+          vc_name: Optional[str] = None, reset: bool = False,
+          summary: Optional[str] = None, summarized_upto: Optional[int] = None):
+    system_prompt = conversation[0]["content"]
+    row = conn.execute(
+        "SELECT prompt_hash, message_count FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if (reset or row is None or row["prompt_hash"] != prompt_hash(system_prompt)
+            or row["message_count"] > len(conversation)):
+        _reset(conn, session_id, system_prompt, vc_name)
+        count = 1
+    else:
+        count = row["message_count"]
+
+    new_messages = conversation[count:]
+    if new_messages:
+        _insert_messages(conn, session_id, new_messages, count)
+        conn.execute(
+            "UPDATE sessions SET message_count = ?, updated_at = ?, version = version + 1 WHERE session_id = ?",
+            (len(conversation), time.time(), session_id),
+        )
+    if summary is not None:
+        conn.execute(
+            "UPDATE sessions SET summary = ?, summarized_upto = ? WHERE session_id = ?",
+            (summary, summarized_upto, session_id),
+        )
+
+def reset_session(session_id: str, system_prompt: str, vc_name: Optional[str] = None):
+    with transaction() as conn:
+        _reset(conn, session_id, system_prompt, vc_name)
+
+def save_session(session_id: str, conversation: List[Dict], vc_name: Optional[str] = None):
+    """Persist ``conversation`` by appending only the messages the store has not seen yet.
+
+    A different system prompt, or a conversation shorter than what is stored, means the
+    session was reset, in which case it is rewritten from scratch.
+    """
+    with transaction() as conn:
+        _save(conn, session_id, conversation, vc_name)
+
+def _version(conn: sqlite3.Connection, session_id: str) -> int:
+    row = conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+    return row["version"] if row else 0
+
+def get_version(session_id: str) -> int:
+    # 0 for sessions that are not stored yet
+    return _version(get_db(), session_id)
+
+def load_session_state(session_id: str) -> Tuple[Optional[List[Dict]], int, Optional[str], str, int]:
+    """``(conversation, version, vc_name, summary, summarized_upto)``; conversation is None if unknown.
+
+    Only consistent while the caller holds the session's lease (or is the only worker).
+    """
+    conversation = load_session(session_id)
+    if conversation is None:
+        return None, 0, None, "", 1
+    row = get_db().execute(
+        "SELECT version, vc_name, summary, summarized_upto FROM sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if row["summarized_upto"] > len(conversation):
+        # Summary of messages that are no longer there (e.g. a legacy rewrite); start over
+        return conversation, row["version"], row["vc_name"], "", 1
+    return conversation, row["version"], row["vc_name"], row["summary"], row["summarized_upto"]
+
+def save_session_versioned(session_id: str, conversation: List[Dict], vc_name: Optional[str],
+                           reset: bool, expected_version: int,
+                           summary: Optional[str] = None, summarized_upto: Optional[int] = None) -> int:
+    """Write-through save that only succeeds if the stored session is still at ``expected_version``.
+
+    Raises SessionConflict otherwise (a reset always wins). Returns the new version.
+    """
+    with transaction() as conn:
+        current = _version(conn, session_id)
+        if not reset and current != expected_version:
+            raise SessionConflict(f"Session {session_id} is at version {current}, expected {expected_version}")
+        _save(conn, session_id, conversation, vc_name, reset, summary, summarized_upto)
+        return _version(conn, session_id)
+
+def save_sessions(batch: List[Tuple[str, List[Dict], Optional[str], bool, str, int]]):
+    # Group commit: many sessions, one transaction and therefore one fsync
+    with transaction() as conn:
+        for session_id, conversation, vc_name, reset, summary, summarized_upto in batch:
+            _save(conn, session_id, conversation, vc_name, reset, summary, summarized_upto)
+
+# --- Leases: one worker at a time runs a turn for a session ---
+def acquire_lease(session_id: str, owner: str, ttl: float) -> bool:
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute("""
+        INSERT INTO session_leases (session_id, owner, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+        WHERE session_leases.expires_at < ? OR session_leases.owner = excluded.owner
+        """, (session_id, owner, now + ttl, now))
+        return cur.rowcount == 1
+
+def renew_lease(session_id: str, owner: str, ttl: float) -> bool:
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE session_leases SET expires_at = ? WHERE session_id = ? AND owner = ?",
+            (time.time() + ttl, session_id, owner),
+        )
+        return cur.rowcount == 1
+
+def release_lease(session_id: str, owner: str):
+    with transaction() as conn:
+        conn.execute("DELETE FROM session_leases WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+# --- Migration from conversations/<id>.json ---
+def import_json_session(path: str) -> bool:
+    session_id = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", encoding="utf-8") as f:
+        conversation = json.load(f)
+    if not conversation or conversation[0].get("role") != "system":
+        return False
+
+    with transaction() as conn:
+        if conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone():
+            return False
+        system_prompt = conversation[0]["content"]
+        digest = _store_prompt(conn, system_prompt)
+        mtime = os.path.getmtime(path)
+        conn.execute(
+            "INSERT INTO sessions (session_id, prompt_hash, vc_name, message_count, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, digest, _vc_name_from_prompt(system_prompt), len(conversation), mtime, mtime),
+        )
+        _insert_messages(conn, session_id, conversation[1:], 1)
+    return True
+
+def import_json_sessions(directory: str = LEGACY_SESSION_DIR) -> int:
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        if import_json_session(path):
+            imported += 1
+    return imported
+
+if __name__ == "__main__":
+    import sys
+    directory = sys.argv[1] if len(sys.argv) > 1 else LEGACY_SESSION_DIR
+    create_session_tables()
+    count = import_json_sessions(directory)
+    print(f"Imported {count} session(s) from {directory}/ into {SESSION_DB_PATH}")
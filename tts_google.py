@@ -1,27 +1,124 @@
-from google.cloud import texttospeech
+from clients import registry as clients
+from metrics import AUDIO_SECONDS, TTS_CACHE, timed
+import diskcache
+import hashlib
+import asyncio
+import json
+import time
 import uuid
 import os
 
-def tts_google(text: str, language_code: str) -> str:
-    client = texttospeech.TextToSpeechClient()
+OUTPUT_DIR = "tts_output"
+VOICE_GENDER = "NEUTRAL"
+AUDIO_ENCODING = "MP3"
+
+# Content-addressed cache of synthesized audio: repeated text never reaches the TTS service
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Files in tts_output/ older than this are treated as abandoned
+TTS_OUTPUT_MAX_AGE = float(os.getenv("TTS_OUTPUT_MAX_AGE", str(60 * 60)))
+
+_tts_cache = None
+
+def get_tts_cache() -> diskcache.Cache:
+    # Opened on first use (or by the app's lifespan), not at import
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = diskcache.Cache(
+            TTS_CACHE_DIR,
+            size_limit=TTS_CACHE_MAX_BYTES,
+            eviction_policy="least-recently-used",
+        )
+    return _tts_cache
+
+def close_tts_cache():
+    global _tts_cache
+    if _tts_cache is not None:
+        _tts_cache.close()
+        _tts_cache = None
+
+# Google's MP3 output is 32 kbps; used to estimate synthesized audio length for metrics
+TTS_MP3_BITRATE = 32000
+
+def _record_synthesis(audio: bytes):
+    AUDIO_SECONDS.observe(len(audio) * 8 / TTS_MP3_BITRATE, direction="out")
+
+def cache_key(text: str, language_code: str, voice: str = VOICE_GENDER, encoding: str = AUDIO_ENCODING) -> str:
+    payload = json.dumps([text, language_code, voice, encoding], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _synthesis_request(text: str, language_code: str):
+    from google.cloud import texttospeech
+
     synthesis_input = texttospeech.SynthesisInput(text=text)
 
     voice = texttospeech.VoiceSelectionParams(
         language_code=language_code,
-        ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
+        ssml_gender=texttospeech.SsmlVoiceGender[VOICE_GENDER]
     )
-    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding[AUDIO_ENCODING])
+    return synthesis_input, voice, audio_config
 
-    response = client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config
-    )
+def synthesize_mp3(text: str, language_code: str) -> bytes:
+    key = cache_key(text, language_code)
+    audio = get_tts_cache().get(key)
+    if audio is not None:
+        TTS_CACHE.inc(result="hit")
+        return audio
+    TTS_CACHE.inc(result="miss")
+
+    client = clients.tts_sync
+    synthesis_input, voice, audio_config = _synthesis_request(text, language_code)
+
+    with timed("tts"):
+        response = client.synthesize_speech(
+            input=synthesis_input,
+            voice=voice,
+            audio_config=audio_config
+        )
+    _record_synthesis(response.audio_content)
+    get_tts_cache().set(key, response.audio_content)
+    return response.audio_content
+
+async def synthesize_mp3_async(text: str, language_code: str) -> bytes:
+    key = cache_key(text, language_code)
+    with timed("tts_cache"):
+        audio = await asyncio.to_thread(get_tts_cache().get, key)
+    if audio is not None:
+        TTS_CACHE.inc(result="hit")
+        return audio
+    TTS_CACHE.inc(result="miss")
 
-    output_dir = "tts_output"
-    os.makedirs(output_dir, exist_ok=True)
-    filename = f"{output_dir}/google_tts_{uuid.uuid4().hex}.mp3"
+    client = clients.tts
+    synthesis_input, voice, audio_config = _synthesis_request(text, language_code)
+
+    with timed("tts"):
+        response = await client.synthesize_speech(
+            input=synthesis_input,
+            voice=voice,
+            audio_config=audio_config
+        )
+    _record_synthesis(response.audio_content)
+    await asyncio.to_thread(get_tts_cache().set, key, response.audio_content)
+    return response.audio_content
+
+def tts_google(text: str, language_code: str) -> str:
+    # File-based variant for scripts; the API serves synthesize_mp3_async bytes directly
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    filename = f"{OUTPUT_DIR}/google_tts_{uuid.uuid4().hex}.mp3"
     with open(filename, "wb") as out:
-        out.write(response.audio_content)
+        out.write(synthesize_mp3(text, language_code))
 
     return filename
+
+def purge_tts_output(max_age: float = TTS_OUTPUT_MAX_AGE) -> int:
+    # Remove abandoned per-reply files left in tts_output/
+    if not os.path.isdir(OUTPUT_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(OUTPUT_DIR):
+        if entry.is_file() and entry.name.endswith(".mp3") and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
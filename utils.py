@@ -1,4 +1,42 @@
-from bs4 import BeautifulSoup
+import re
+from contextlib import AsyncExitStack, asynccontextmanager
+
+# End of a sentence: terminal punctuation, optional closing quote/bracket, then whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
 
 def clean_html(text: str) -> str:
+    from bs4 import BeautifulSoup
     return BeautifulSoup(text, "html.parser").get_text()
+
+async def iter_sentences(tokens, min_chars: int = 20):
+    """Regroup an async stream of LLM tokens into sentences as soon as each one is complete.
+
+    Fragments shorter than ``min_chars`` are merged with the following sentence so that
+    downstream TTS calls are not wasted on "Sure." or "Mr.".
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        pos = 0
+        while match := _SENTENCE_END.search(buffer, pos):
+            if match.end() < min_chars:
+                pos = match.end()
+                continue
+            sentence = buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+            pos = 0
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+def compose_lifespans(*lifespans):
+    """Chain FastAPI lifespan hooks: entered in order, exited in reverse order."""
+    @asynccontextmanager
+    async def lifespan(app):
+        async with AsyncExitStack() as stack:
+            for hook in lifespans:
+                await stack.enter_async_context(hook(app))
+            yield
+
+    return lifespan
@@ -0,0 +1,130 @@
+"""Energy-based voice activity detection on 16-bit mono PCM.
+
+Used before speech recognition to drop leading/trailing silence, shorten long pauses and cut
+long recordings at pauses into segments that can be recognized concurrently.
+"""
+import os
+from array import array
+from dataclasses import dataclass
+from typing import List, Tuple
+
+try:
+    import audioop
+except ImportError:  # removed from the standard library in Python 3.13; fall back to pure Python
+    audioop = None
+
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_MIN_RMS = int(os.getenv("VAD_MIN_RMS", "300"))            # never call quieter frames speech
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "3.0"))  # speech threshold over the noise floor
+VAD_LOUD_FRACTION = float(os.getenv("VAD_LOUD_FRACTION", "0.3"))  # ... but at most this share of loud frames
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))              # kept around speech so words aren't clipped
+VAD_MIN_PAUSE_MS = int(os.getenv("VAD_MIN_PAUSE_MS", "500"))  # shorter gaps are part of the speech
+VAD_KEEP_PAUSE_MS = int(os.getenv("VAD_KEEP_PAUSE_MS", "300"))  # longer pauses are shortened to this
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "150"))  # shorter bursts are clicks/noise
+VAD_SEGMENT_SECONDS = float(os.getenv("VAD_SEGMENT_SECONDS", "20"))
+VAD_MAX_SEGMENT_SECONDS = float(os.getenv("VAD_MAX_SEGMENT_SECONDS", "50"))
+
+SAMPLE_WIDTH = 2
+
+
+def rms(frame: bytes) -> int:
+    if audioop is not None:
+        return audioop.rms(frame, SAMPLE_WIDTH)
+    samples = array("h", frame)
+    if not samples:
+        return 0
+    return int((sum(s * s for s in samples) / len(samples)) ** 0.5)
+
+
+@dataclass
+class Segment:
+    start: int  # byte offsets into the original PCM, for logging and tests
+    end: int
+    audio: bytes
+
+    def seconds(self, sample_rate: int) -> float:
+        return len(self.audio) / (sample_rate * SAMPLE_WIDTH)
+
+
+def speech_spans(pcm: bytes, sample_rate: int) -> List[Tuple[int, int]]:
+    """Byte ranges of speech, padded and with short gaps merged; empty if nothing is louder
+    than the noise floor."""
+    frame_bytes = sample_rate * SAMPLE_WIDTH * VAD_FRAME_MS // 1000
+    if frame_bytes == 0 or len(pcm) < frame_bytes:
+        return []
+    energies = [rms(pcm[i:i + frame_bytes]) for i in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+
+    # The quietest tenth approximates the background noise; capping the threshold relative to
+    # the loud frames keeps recordings that are almost all speech from being dropped entirely
+    ordered = sorted(energies)
+    noise_floor, loud = ordered[len(ordered) // 10], ordered[len(ordered) * 9 // 10]
+    threshold = max(VAD_MIN_RMS, min(noise_floor * VAD_NOISE_RATIO, loud * VAD_LOUD_FRACTION))
+
+    spans, start = [], None
+    for i, energy in enumerate(energies + [0]):
+        if energy >= threshold and start is None:
+            start = i
+        elif energy < threshold and start is not None:
+            spans.append([start, i])
+            start = None
+
+    min_gap = VAD_MIN_PAUSE_MS // VAD_FRAME_MS
+    merged: List[List[int]] = []
+    for span in spans:
+        if merged and span[0] - merged[-1][1] < min_gap:
+            merged[-1][1] = span[1]
+        else:
+            merged.append(span)
+
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    result = []
+    for first, last in merged:
+        if last - first < min_frames:
+            continue
+        start_byte = max(0, first - pad) * frame_bytes
+        end_byte = min(len(pcm), (last + pad) * frame_bytes)
+        if result and start_byte <= result[-1][1]:
+            result[-1] = (result[-1][0], end_byte)
+        else:
+            result.append((start_byte, end_byte))
+    return result
+
+
+def split_segments(pcm: bytes, sample_rate: int) -> List[Segment]:
+    """Group speech into segments of about ``VAD_SEGMENT_SECONDS``, cut only at pauses.
+
+    Pauses inside a segment are shortened to ``VAD_KEEP_PAUSE_MS``; a single stretch of speech
+    longer than ``VAD_MAX_SEGMENT_SECONDS`` is cut hard. Returns [] when no speech is found.
+    """
+    bytes_per_second = sample_rate * SAMPLE_WIDTH
+    target = int(VAD_SEGMENT_SECONDS * bytes_per_second)
+    limit = int(VAD_MAX_SEGMENT_SECONDS * bytes_per_second)
+    keep_pause = bytes_per_second * VAD_KEEP_PAUSE_MS // 1000 // SAMPLE_WIDTH * SAMPLE_WIDTH
+
+    spans = []
+    for start, end in speech_spans(pcm, sample_rate):
+        while end - start > limit:
+            spans.append((start, start + limit))
+            start += limit
+        spans.append((start, end))
+
+    segments: List[Segment] = []
+    parts: List[bytes] = []
+    size, seg_start, prev_end = 0, 0, 0
+    for start, end in spans:
+        if parts and size + (end - start) > target:
+            segments.append(Segment(seg_start, prev_end, b"".join(parts)))
+            parts, size = [], 0
+        if parts:
+            pause = pcm[prev_end:min(start, prev_end + keep_pause)]
+            parts.append(pause)
+            size += len(pause)
+        else:
+            seg_start = start
+        parts.append(pcm[start:end])
+        size += end - start
+        prev_end = end
+    if parts:
+        segments.append(Segment(seg_start, prev_end, b"".join(parts)))
+    return segments
@@ -0,0 +1,301 @@
+"""Full-duplex voice session over a WebSocket: ``/vc/voice``.
+
+The client streams microphone audio as binary frames of 16 kHz mono LINEAR16 PCM (about
+100 ms each). The server forwards it to streaming recognition with interim results, runs the
+VC turn once the founder stops speaking and streams the reply back while it is generated:
+
+    server -> client  {"type": "transcript", "text": ..., "final": bool}
+                      {"type": "reply", "token": ...}          LLM tokens as they arrive
+                      <binary>                                 MP3 chunks, one per sentence
+                      {"type": "turn_end", ...}                the ``/vc/message`` response
+                      {"type": "interrupted"}                  the reply was cut off
+                      {"type": "error", "detail": ...}
+    client -> server  <binary>                                 PCM frames
+                      {"type": "end"}                          end of utterance now (push-to-talk)
+                      {"type": "exit"}                         ask for the final evaluation
+
+Browsers cannot set headers on a WebSocket, so a signed-in client passes its bearer token as the
+``token`` query parameter; the final evaluation is then stored under that user. Without a token
+the session is anonymous, and an invalid or expired token rejects the handshake.
+
+If the founder starts speaking while a reply is being generated or spoken, the LLM stream and
+the pending synthesis are cancelled. A reply that was cut off before it was complete is not
+stored, and the founder's interrupted message is sent again together with what they say next.
+Clients should apply echo cancellation to the microphone, otherwise the reply played back is
+recognized as the founder speaking.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+
+import vad
+from auth_api import get_current_user
+from bot_api import SESSION_ENDED_MESSAGE, UserInput, stream_vc_turn
+from clients import registry as clients
+from google_new import SAMPLE_RATE
+from main_controller import pipelined_speech
+from metrics import AUDIO_SECONDS, observe_stage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# A frame at least this loud counts as the founder speaking
+VOICE_SPEECH_RMS = int(os.getenv("VOICE_SPEECH_RMS", "500"))
+# Silence after the last recognized words that ends the utterance
+VOICE_END_SILENCE_MS = int(os.getenv("VOICE_END_SILENCE_MS", "600"))
+# Recognition streams are limited to about five minutes; a new one is opened before that
+VOICE_STREAM_SECONDS = float(os.getenv("VOICE_STREAM_SECONDS", "240"))
+# Recognition streams that may fail in a row before the session is closed
+VOICE_MAX_RESTARTS = int(os.getenv("VOICE_MAX_RESTARTS", "3"))
+# Seconds of audio buffered between the socket and recognition
+VOICE_QUEUE_SECONDS = int(os.getenv("VOICE_QUEUE_SECONDS", "5"))
+
+_POLL_SECONDS = 0.05
+
+
+class VoiceSession:
+    """State of one WebSocket voice session; see the module docstring for the protocol."""
+
+    def __init__(self, websocket: WebSocket, session_id: str, vc_name: str, language_code: str,
+                 username: Optional[str] = None):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.vc_name = vc_name
+        self.language_code = language_code
+        self.username = username
+        # ~100 ms frames; a full queue pushes back on the socket instead of growing
+        self.audio: asyncio.Queue = asyncio.Queue(maxsize=VOICE_QUEUE_SECONDS * 10)
+        self.send_lock = asyncio.Lock()
+
+        self.final_parts: List[str] = []  # recognized since the last turn started
+        self.interim = ""
+        self.last_speech = time.monotonic()
+        self.audio_bytes = 0
+
+        self.turn: Optional[asyncio.Task] = None
+        self.turn_message = ""            # the founder message of the running turn
+        self.turn_committed = False       # the reply was stored; only its audio is still playing
+        self.end_requested = False
+        self.closed = asyncio.Event()
+
+    async def send_json(self, event: dict):
+        async with self.send_lock:
+            await self.websocket.send_text(json.dumps(event))
+
+    async def send_bytes(self, data: bytes):
+        async with self.send_lock:
+            await self.websocket.send_bytes(data)
+
+    # --- client -> server -------------------------------------------------------------------
+
+    async def receive(self):
+        while not self.closed.is_set():
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                frame = message["bytes"]
+                self.audio_bytes += len(frame)
+                if vad.rms(frame) >= VOICE_SPEECH_RMS:
+                    self.last_speech = time.monotonic()
+                await self.audio.put(frame)
+            elif message.get("text"):
+                try:
+                    kind = json.loads(message["text"]).get("type")
+                except (ValueError, AttributeError):
+                    await self.send_json({"type": "error", "detail": "Expected a JSON object."})
+                    continue
+                if kind == "end":
+                    self.end_requested = True
+                elif kind == "exit":
+                    await self.cancel_turn()
+                    self.start_turn("exit")
+
+    # --- recognition ------------------------------------------------------------------------
+
+    async def _requests(self, deadline: float):
+        from google.cloud import speech
+
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=SAMPLE_RATE,
+            language_code=self.language_code,
+        )
+        yield speech.StreamingRecognizeRequest(streaming_config=speech.StreamingRecognitionConfig(
+            config=config,
+            interim_results=True,
+            single_utterance=False,
+        ))
+        while time.monotonic() < deadline and not self.closed.is_set():
+            try:
+                frame = await asyncio.wait_for(self.audio.get(), _POLL_SECONDS * 4)
+            except asyncio.TimeoutError:
+                continue
+            yield speech.StreamingRecognizeRequest(audio_content=frame)
+
+    async def recognize(self):
+        failures = 0
+        while not self.closed.is_set():
+            try:
+                responses = await clients.speech_async.streaming_recognize(
+                    requests=self._requests(time.monotonic() + VOICE_STREAM_SECONDS))
+                async for response in responses:
+                    failures = 0
+                    for result in response.results:
+                        if result.alternatives:
+                            await self.on_transcript(result.alternatives[0].transcript, result.is_final)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning("Voice recognition stream failed (%d/%d): %r", failures, VOICE_MAX_RESTARTS, e)
+                if failures >= VOICE_MAX_RESTARTS:
+                    await self.send_json({"type": "error", "detail": "Speech recognition failed."})
+                    self.closed.set()
+                    return
+                await asyncio.sleep(_POLL_SECONDS * 10)
+            # An in-flight interim result does not survive the stream it came from
+            self.interim = ""
+
+    async def on_transcript(self, text: str, final: bool):
+        text = text.strip()
+        if not text:
+            return
+        # Founder speaking over the reply: barge-in
+        if self.turn is not None and not self.turn.done():
+            await self.cancel_turn(interrupted=True)
+        if final:
+            self.final_parts.append(text)
+            self.interim = ""
+        else:
+            self.interim = text
+        await self.send_json({"type": "transcript", "text": text, "final": final})
+
+    async def detect_end_of_utterance(self):
+        while not self.closed.is_set():
+            await asyncio.sleep(_POLL_SECONDS)
+            if self.turn is not None and not self.turn.done():
+                continue
+            silent_ms = (time.monotonic() - self.last_speech) * 1000
+            if self.end_requested or (self.final_parts and not self.interim and silent_ms >= VOICE_END_SILENCE_MS):
+                # Push-to-talk: an interim result is the best transcript there is
+                parts = self.final_parts + ([self.interim] if self.end_requested and self.interim else [])
+                self.end_requested = False
+                if parts:
+                    self.final_parts, self.interim = [], ""
+                    self.start_turn(" ".join(parts))
+
+    # --- turns ------------------------------------------------------------------------------
+
+    def start_turn(self, message: str):
+        if self.turn_message and not self.turn_committed and message != "exit":
+            # The previous reply was interrupted before it was stored: its message is still unanswered
+            message = f"{self.turn_message} {message}"
+        self.turn_message, self.turn_committed = message, False
+        self.turn = asyncio.create_task(self.run_turn(message))
+
+    async def cancel_turn(self, interrupted: bool = False):
+        turn, self.turn = self.turn, None
+        if turn is None or turn.done():
+            return
+        turn.cancel()
+        try:
+            await turn
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Voice turn failed while being cancelled")
+        if interrupted:
+            await self.send_json({"type": "interrupted"})
+
+    async def run_turn(self, message: str):
+        user_input = UserInput(message=message, session_id=self.session_id, vc_name=self.vc_name)
+        ended = time.monotonic()
+        final = {}
+
+        async def tokens():
+            events = stream_vc_turn(user_input, self.username)
+            streamed = False
+            try:
+                async for event in events:
+                    if "token" in event:
+                        streamed = True
+                        await self.send_json({"type": "reply", "token": event["token"]})
+                        yield event["token"]
+                    else:
+                        # Final event: the turn is stored from here on
+                        final.update(event)
+                        self.turn_committed = True
+                        if not streamed and event.get("message"):
+                            yield event["message"]
+            finally:
+                # A barge-in releases the session turn right away
+                await events.aclose()
+
+        speech = pipelined_speech(tokens(), self.language_code)
+        try:
+            first = True
+            async for chunk in speech:
+                if first:
+                    observe_stage("voice_first_audio", time.monotonic() - ended)
+                    first = False
+                await self.send_bytes(chunk)
+            await self.send_json({"type": "turn_end", **final})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Voice turn failed for session %s", self.session_id)
+            await self.send_json({"type": "error", "detail": str(e)})
+            return
+        finally:
+            await speech.aclose()
+        self.turn_message = ""
+        if final.get("done") or final.get("message") == SESSION_ENDED_MESSAGE:
+            self.closed.set()
+
+    # --- lifecycle --------------------------------------------------------------------------
+
+    async def run(self):
+        tasks = [asyncio.create_task(coro) for coro in (self.receive(), self.recognize(), self.detect_end_of_utterance())]
+        closed = asyncio.create_task(self.closed.wait())
+        try:
+            await asyncio.wait(tasks + [closed], return_when=asyncio.FIRST_COMPLETED)
+            # The evaluation is the last turn: let it finish streaming before closing
+            if self.closed.is_set() and self.turn is not None:
+                await asyncio.gather(self.turn, return_exceptions=True)
+        finally:
+            self.closed.set()
+            for task in tasks + [closed]:
+                task.cancel()
+            await self.cancel_turn()
+            await asyncio.gather(*tasks, closed, return_exceptions=True)
+            AUDIO_SECONDS.observe(self.audio_bytes / (SAMPLE_RATE * vad.SAMPLE_WIDTH), direction="in")
+
+
+@router.websocket("/vc/voice")
+async def voice_session(websocket: WebSocket, session_id: str, vc_name: str = "Default", language_code: str = "en-US",
+                        token: Optional[str] = None):
+    username = None
+    if token is not None:
+        try:
+            username = (await get_current_user(token)).username
+        except HTTPException:
+            # Closing before accept rejects the handshake
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await websocket.accept()
+    session = VoiceSession(websocket, session_id, vc_name, language_code, username)
+    try:
+        await session.run()
+    except WebSocketDisconnect:
+        return
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass  # the client already went away